@@ -26,6 +26,7 @@ a = Analysis(
         'pydantic.networks',
         'pydantic.types',
         'fdb',
+        'orjson',
         'python-dotenv',
         'models',
         'database',
@@ -33,6 +34,7 @@ a = Analysis(
         'starlette',
         'starlette.middleware',
         'starlette.middleware.cors',
+        'starlette.middleware.gzip',
         'anyio',
         'anyio._backends._asyncio',
     ],
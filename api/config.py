@@ -14,12 +14,18 @@ class Settings(BaseSettings):
     DB_USER: str = "sysdba"
     DB_PASSWORD: str = "masterkey"
     DB_CHARSET: str = "WIN1251"
+    # Максимальное количество свободных соединений в пуле
+    DB_POOL_SIZE: int = 8
+    # Соединение, простоявшее в пуле дольше (сек), проверяется запросом перед выдачей
+    DB_POOL_VALIDATE_IDLE_SECONDS: int = 30
     # Optional explicit path to Firebird client library (fbclient.dll / libfbclient.dylib / libfbclient.so)
     FBCLIENT_PATH: str = ""
     
     # API
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8015
+    # Разрешенные источники CORS (в .env задается JSON-списком)
+    CORS_ORIGINS: list[str] = ["*"]
     
     class Config:
         env_file = ".env"
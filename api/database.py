@@ -2,12 +2,26 @@
 Модуль для работы с базой данных Firebird
 """
 import fdb
+import logging
 import os
+import queue
 import sys
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from config import settings
 
 
+# Максимальное количество подготовленных запросов на одно соединение
+STATEMENT_CACHE_SIZE = 128
+
+# Проверка соединения из пула, простоявшего дольше DB_POOL_VALIDATE_IDLE_SECONDS
+SQL_PING = "SELECT 1 FROM RDB$DATABASE"
+
+logger = logging.getLogger("barcodes")
+
+
 def _candidate_fbclient_paths() -> list[str]:
     # Highest priority: explicit env/config path
     candidates: list[str] = []
@@ -61,6 +75,29 @@ def _load_fbclient() -> None:
 _load_fbclient()
 
 
+class StatementCache:
+    """LRU-кеш подготовленных запросов (cursor.prep) для одного соединения"""
+
+    def __init__(self, connection, maxsize: int = STATEMENT_CACHE_SIZE):
+        # Подготовленный запрос привязан к курсору, на котором он создан
+        self.cursor = connection.cursor()
+        self.maxsize = maxsize
+        self._statements = OrderedDict()
+
+    def get(self, query: str):
+        """Вернуть подготовленный запрос, подготовив его при первом обращении"""
+        statement = self._statements.get(query)
+        if statement is not None:
+            self._statements.move_to_end(query)
+            return statement
+
+        statement = self.cursor.prep(query)
+        self._statements[query] = statement
+        if len(self._statements) > self.maxsize:
+            self._statements.popitem(last=False)
+        return statement
+
+
 class Database:
     """Класс для работы с Firebird базой данных"""
     
@@ -71,43 +108,170 @@ class Database:
         self.user = settings.DB_USER
         self.password = settings.DB_PASSWORD
         self.charset = settings.DB_CHARSET
-    
+        # Пул свободных соединений (не более DB_POOL_SIZE): пары (соединение, time.monotonic() возврата)
+        self._pool = queue.LifoQueue(maxsize=settings.DB_POOL_SIZE)
+        # Кеши подготовленных запросов по соединениям (удаляются при закрытии соединения)
+        self._statement_caches = {}
+        # Соединение, занятое текущим потоком (один запрос API - одно соединение)
+        self._local = threading.local()
+
+    def get_statement_cache(self, connection) -> StatementCache:
+        """Получить кеш подготовленных запросов для соединения"""
+        cache = self._statement_caches.get(connection)
+        if cache is None:
+            cache = StatementCache(connection)
+            self._statement_caches[connection] = cache
+        return cache
+
+    def _connect(self):
+        """Открыть новое соединение с БД"""
+        # Для Firebird используем формат: host/port:database
+        dsn = f"{self.host}/{self.port}:{self.database}"
+
+        logger.info("Подключение к БД: %s (пользователь %s)", dsn, self.user)
+
+        connection = fdb.connect(
+            dsn=dsn,
+            user=self.user.upper(),  # Firebird чувствителен к регистру
+            password=self.password,
+            charset=self.charset
+        )
+        logger.info("Соединение с БД установлено")
+        return connection
+
+    def _is_alive(self, connection) -> bool:
+        """Соединение отвечает на простой запрос (не разорвано перезапуском сервера/сети)"""
+        try:
+            cache = self.get_statement_cache(connection)
+            cache.cursor.execute(cache.get(SQL_PING))
+            cache.cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        """Взять рабочее соединение из пула или открыть новое"""
+        while True:
+            try:
+                connection, released_at = self._pool.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            # Давно простаивающее соединение могло быть разорвано - проверяем до выдачи,
+            # чтобы ошибку получил не запрос сканирования
+            if time.monotonic() - released_at < settings.DB_POOL_VALIDATE_IDLE_SECONDS:
+                return connection
+            if self._is_alive(connection):
+                return connection
+            logger.warning("Соединение из пула не отвечает - закрываем")
+            self._close(connection)
+
+    def _close(self, connection):
+        """Закрыть соединение и забыть его подготовленные запросы"""
+        self._statement_caches.pop(connection, None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _release(self, connection):
+        """Вернуть соединение в пул"""
+        try:
+            # Завершаем открытую транзакцию, чтобы следующий запрос видел свежие данные
+            connection.rollback()
+        except Exception:
+            # Соединение неработоспособно - не возвращаем его в пул
+            self._close(connection)
+            return
+
+        try:
+            self._pool.put_nowait((connection, time.monotonic()))
+        except queue.Full:
+            self._close(connection)
+
     @contextmanager
     def get_connection(self):
-        """Контекстный менеджер для получения соединения с БД"""
-        connection = None
+        """Контекстный менеджер для получения соединения с БД из пула
+
+        Вложенные вызовы в том же потоке получают то же соединение; изменения,
+        сделанные через execute_update/execute_procedure внутри них, фиксируются
+        одним commit при выходе из внешнего вызова (при ошибке - откатываются).
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            # Вложенный вызов в том же потоке - продолжаем на уже занятом соединении
+            self._local.depth += 1
+            try:
+                yield connection
+            finally:
+                self._local.depth -= 1
+            return
+
+        connection = self._checkout()
+        self._local.connection = connection
+        self._local.depth = 0
+        self._local.commit_pending = False
+        broken = False
         try:
-            # Для Firebird используем формат: host/port:database
-            dsn = f"{self.host}/{self.port}:{self.database}"
-
-            print(f"Подключение к БД с DSN: {dsn}")
-            print(f"Пользователь: {self.user}")
-            print(f"Пароль: {'*' * len(self.password)}")
-
-            connection = fdb.connect(
-                dsn=dsn,
-                user=self.user.upper(),  # Firebird чувствителен к регистру
-                password=self.password,
-                charset=self.charset
-            )
-            print("[OK] Соединение установлено")
             yield connection
-        except Exception as e:
-            if connection:
-                connection.rollback()
-            raise e
+            if self._local.commit_pending:
+                connection.commit()
+        except fdb.DatabaseError:
+            # После ошибки БД соединение может быть в неизвестном состоянии
+            broken = True
+            raise
         finally:
-            if connection:
-                connection.close()
+            self._local.connection = None
+            if broken:
+                self._close(connection)
+            else:
+                # При ошибке незафиксированные изменения откатываются в _release
+                self._release(connection)
     
+    def _commit(self, connection):
+        """Зафиксировать изменения; во вложенном вызове - отложить до выхода из внешнего"""
+        if self._local.depth:
+            self._local.commit_pending = True
+        else:
+            connection.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Несколько запросов в одной транзакции: commit при выходе, rollback при ошибке
+
+        Внутри внешнего get_connection транзакция соединения уже общая: при ошибке
+        откатывается только до точки сохранения, а фиксацию выполняет внешний вызов.
+        """
+        with self.get_connection() as conn:
+            cache = self.get_statement_cache(conn)
+            if self._local.depth:
+                savepoint = f"TX_{self._local.depth}"
+                conn.savepoint(savepoint)
+                try:
+                    yield cache
+                except Exception:
+                    conn.rollback(savepoint=savepoint)
+                    raise
+                self._local.commit_pending = True
+                return
+
+            try:
+                yield cache
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+
     def execute_query(self, query: str, params: tuple = None):
         """Выполнить SELECT запрос и вернуть результаты"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            cache = self.get_statement_cache(conn)
+            cursor = cache.cursor
+            statement = cache.get(query)
             if params:
-                cursor.execute(query, params)
+                cursor.execute(statement, params)
             else:
-                cursor.execute(query)
+                cursor.execute(statement)
             
             # Получаем названия столбцов
             columns = [desc[0] for desc in cursor.description]
@@ -122,15 +286,33 @@ class Database:
             
             return result
     
+    def execute_procedure(self, query: str, params: tuple = None):
+        """Выполнить изменяющий данные EXECUTE BLOCK/процедуру и вернуть результаты"""
+        with self.get_connection() as conn:
+            cache = self.get_statement_cache(conn)
+            cursor = cache.cursor
+            statement = cache.get(query)
+            if params:
+                cursor.execute(statement, params)
+            else:
+                cursor.execute(statement)
+
+            columns = [desc[0] for desc in cursor.description]
+            result = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            self._commit(conn)
+            return result
+
     def execute_update(self, query: str, params: tuple = None):
         """Выполнить UPDATE/INSERT запрос"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            cache = self.get_statement_cache(conn)
+            cursor = cache.cursor
+            statement = cache.get(query)
             if params:
-                cursor.execute(query, params)
+                cursor.execute(statement, params)
             else:
-                cursor.execute(query)
-            conn.commit()
+                cursor.execute(statement)
+            self._commit(conn)
             return cursor.rowcount
 
 
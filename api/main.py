@@ -1,15 +1,26 @@
 """
 API сервер для системы учета готовности изделий
 """
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 import fdb
+import logging
+import logging.handlers
+import orjson
+import queue
+import re
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
 
 from models import (
     BarcodeRequest, ApprovalResponse, ProductInfo, HealthResponse,
+    BarcodeBatchRequest, BarcodeBatchResponse,
     DailyStatsResponse, DailyStatsRow, OrderStatsResponse, OrderStatsRow
 )
 from database import db
@@ -19,18 +30,45 @@ from config import settings
 app = FastAPI(
     title="Barcode Approval API",
     description="API для приходования изделий по штрихкоду",
-    version="1.2.0"  # Добавлены endpoints для статистики
+    version="1.2.0",  # Добавлены endpoints для статистики
+    default_response_class=ORJSONResponse  # orjson сериализует ответы быстрее stdlib json
 )
 
 # CORS middleware для возможности обращения с клиента
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,  # браузер кеширует preflight на сутки
 )
 
+# Отчеты статистики (сотни строк JSON) сжимаются; короткие ответы на штрихкоды - нет
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+
+# Логи пишутся в очередь, а в stdout их выводит отдельный поток QueueListener,
+# чтобы обработка запросов не ждала блокировку и сброс stdout
+logger = logging.getLogger("barcodes")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream_handler)
+
+
+@app.on_event("startup")
+def _start_log_listener():
+    _log_listener.start()
+
+
+@app.on_event("shutdown")
+def _stop_log_listener():
+    _log_listener.stop()
+
 
 @app.on_event("startup")
 def _start_order_ready_worker():
@@ -38,6 +76,27 @@ def _start_order_ready_worker():
     thread.start()
 
 
+# Префикс штрихкода -> тип (включая старые префиксы для обратной совместимости)
+BARCODE_PREFIX_TYPES = {
+    'D': 'IZD',
+    'B': 'IZD',
+    'ORD': 'ORD',
+    'R': 'ORD',
+    'T': 'ITM',
+    'S': 'SET',
+    'IZD': 'IZD',
+    'ITM': 'ITM',
+    'SET': 'SET',
+}
+BARCODE_PREFIX_RE = re.compile(
+    r"^(" + "|".join(BARCODE_PREFIX_TYPES) + r")\s*-\s*(.*?)\s*$",
+    re.DOTALL
+)
+
+
+# Сканеры часто повторно отправляют тот же штрихкод - разбор берется из кеша
+# (возвращаемый словарь общий для повторов, изменять его нельзя)
+@lru_cache(maxsize=4096)
 def parse_barcode(barcode: str) -> dict:
     """
     Парсинг штрихкода с определением типа
@@ -61,28 +120,7 @@ def parse_barcode(barcode: str) -> dict:
     """
     barcode = barcode.strip().upper()
 
-    # Проверка на наличие префикса (формат X-... или XXX-...)
-    if '-' in barcode:
-        parts = barcode.split('-', 1)
-        if len(parts) == 2:
-            prefix, value = parts
-            prefix = prefix.strip()
-            value = value.strip()
-
-            # Новые префиксы
-            if prefix == 'D' or prefix == 'B':
-                return {'type': 'IZD', 'value': value}
-            elif prefix == 'ORD' or prefix == 'R':
-                return {'type': 'ORD', 'value': value}
-            elif prefix == 'T':
-                return {'type': 'ITM', 'value': value}
-            elif prefix == 'S':
-                return {'type': 'SET', 'value': value}
-            # Старые префиксы (обратная совместимость)
-            elif prefix in ['IZD', 'ITM', 'SET']:
-                return {'type': prefix, 'value': value}
-
-    # Старый формат без префикса
+    # Старый формат без префикса (самый частый случай - проверяем первым)
     if barcode.isdigit():
         if len(barcode) == 9:
             return {
@@ -95,6 +133,13 @@ def parse_barcode(barcode: str) -> dict:
                 'value': barcode
             }
 
+    # Проверка на наличие префикса (формат X-... или XXX-...)
+    if '-' in barcode:
+        match = BARCODE_PREFIX_RE.match(barcode)
+        if match:
+            prefix, value = match.groups()
+            return {'type': BARCODE_PREFIX_TYPES[prefix], 'value': value}
+
     # Неизвестный формат
     return {
         'type': 'UNKNOWN',
@@ -102,6 +147,9 @@ def parse_barcode(barcode: str) -> dict:
     }
 
 
+# Имя стеклопакета "19686 / 01 / С-1 [G 2 665]": номер заказа и номер изделия
+GLASS_NAME_RE = re.compile(r"^\s*([^/]*?)\s*/\s*([^/]*?)\s*(?:/|$)")
+
 ORDER_STATS_FILTERS = {
     "product": "(el.CTTYPEELEMSID = 2 AND COALESCE(m.SYSPROFID, 0) <> 27)",
     "set": "(el.CTTYPEELEMSID = 7)",
@@ -109,88 +157,345 @@ ORDER_STATS_FILTERS = {
 }
 ORDER_STATS_ALL_CONDITION = "(" + " OR ".join(ORDER_STATS_FILTERS.values()) + ")"
 ORDER_READY_POLL_SECONDS = 300
+ORDER_STATE_READY = 4
+ORDER_READY_COMMENT = 'Автоматическая установка статуса после штрихкодирования'
+ORDER_STATE_SHIPPED = 5
+ORDER_SHIPPED_COMMENT = 'Автоматическая установка статуса "Отгружен" после сканирования штрихкода заказа'
+
+# Смена статуса заказа за один запрос: если заказ еще не в статусе STATE_ID,
+# добавляем запись в ORDERSTATESREG (EMPID = 8, "Скрипт sChangeState")
+# со следующей позицией и обновляем ORDERS. CHANGED = 1, если статус изменен.
+SQL_SET_ORDER_STATE = """
+    EXECUTE BLOCK (
+        ORDER_ID INTEGER = ?,
+        STATE_ID INTEGER = ?,
+        STATE_COMMENT VARCHAR(255) = ?
+    )
+    RETURNS (CHANGED SMALLINT)
+    AS
+    BEGIN
+        CHANGED = 0;
+        IF (NOT EXISTS(
+            SELECT 1 FROM ORDERS WHERE ORDERID = :ORDER_ID AND ORDERSTATEID = :STATE_ID
+        )) THEN
+        BEGIN
+            INSERT INTO ORDERSTATESREG
+                (ORDERSTATESREGID, ORDERID, ORDERSTATEID, EMPID, CHANGEDATE, STATEPOSIT, RCOMMENT)
+            VALUES (
+                GEN_ID(GEN_ORDERSTATESREG, 1), :ORDER_ID, :STATE_ID, 8, CURRENT_TIMESTAMP,
+                (SELECT COALESCE(MAX(STATEPOSIT), 0) + 1 FROM ORDERSTATESREG WHERE ORDERID = :ORDER_ID),
+                :STATE_COMMENT
+            );
+
+            UPDATE ORDERS SET ORDERSTATEID = :STATE_ID WHERE ORDERID = :ORDER_ID;
+            CHANGED = 1;
+        END
+        SUSPEND;
+    END
+"""
 
+# Заказы в статусе 10, у которых все позиции склада оприходованы
+SQL_READY_ORDERS = """
+    SELECT o.ORDERID, o.ORDERNO
+    FROM ORDERS o
+    JOIN (
+        SELECT
+            COALESCE(el.ORDERID, oi.ORDERID) AS ORDERID,
+            SUM(wd.QTY) AS TOTAL_QTY,
+            SUM(CASE WHEN COALESCE(wd.ISAPPROVED, 0) = 0 THEN 1 ELSE 0 END) AS NOT_APPROVED_COUNT
+        FROM CT_WHDETAIL wd
+        JOIN CT_ELEMENTS el ON wd.CTELEMENTSID = el.CTELEMENTSID
+        LEFT JOIN ORDERITEMS oi ON el.ORDERITEMSID = oi.ORDERITEMSID
+        GROUP BY COALESCE(el.ORDERID, oi.ORDERID)
+    ) s ON s.ORDERID = o.ORDERID
+    WHERE o.DELETED = 0
+      AND o.ORDERSTATEID = 10
+      AND s.TOTAL_QTY > 0
+      AND s.NOT_APPROVED_COUNT = 0
+"""
 
-def _log_worker(message: str) -> None:
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[ORDER-READY] {timestamp} {message}")
+# === SQL-запросы обработчиков штрихкодов ===
+
+SQL_ELEMENT_BY_ITEMSDETAILID = """
+    SELECT
+        e.CTELEMENTSID,
+        e.RNAME as ELEMENT_NAME,
+        e.WIDTH,
+        e.HEIGHT,
+        e.MODELID,
+        e.ORDERITEMSID,
+        e.ITEMSDETAILID,
+        gg.GGTYPEID as GGTYPEID,
+        ggt.NAME as GGTYPE_NAME,
+        o.ORDERID,
+        o.ORDERNO,
+        o.PRODDATE,
+        w.CTWHDETAILID,
+        w.ISAPPROVED,
+        w.DATEAPPROVED,
+        w.ITEMNO
+    FROM CT_ELEMENTS e
+    LEFT JOIN ITEMSDETAIL idetail ON idetail.ITEMSDETAILID = e.ITEMSDETAILID
+    LEFT JOIN GROUPGOODS gg ON gg.GRGOODSID = idetail.GRGOODSID
+    LEFT JOIN GROUPGOODSTYPES ggt ON ggt.GGTYPEID = gg.GGTYPEID
+    LEFT JOIN ORDERITEMS oi ON oi.ORDERITEMSID = e.ORDERITEMSID
+    LEFT JOIN ORDERS o ON o.ORDERID = oi.ORDERID
+    LEFT JOIN CT_WHDETAIL w ON w.CTELEMENTSID = e.CTELEMENTSID
+    WHERE e.ITEMSDETAILID = ?
+"""
 
+SQL_APPROVE_WHDETAIL = """
+    UPDATE CT_WHDETAIL
+    SET ISAPPROVED = 1,
+        DATEAPPROVED = CURRENT_TIMESTAMP
+    WHERE CTWHDETAILID = ?
+"""
 
-def _rows_to_dicts(cursor, rows):
-    columns = [desc[0] for desc in cursor.description]
-    return [dict(zip(columns, row)) for row in rows]
+SQL_ELEMENTS_BY_ITEMSSETSID = """
+    SELECT
+        e.CTELEMENTSID,
+        e.RNAME as ELEMENT_NAME,
+        e.WIDTH,
+        e.HEIGHT,
+        e.MODELID,
+        e.ORDERITEMSID,
+        e.ITEMSSETSID
+    FROM CT_ELEMENTS e
+    WHERE e.ITEMSSETSID = ?
+"""
 
+SQL_WHDETAIL_BY_CTELEMENTSIDS = """
+    SELECT
+        w.CTWHDETAILID,
+        w.ISAPPROVED,
+        w.DATEAPPROVED,
+        w.ITEMNO,
+        w.CTELEMENTSID
+    FROM CT_WHDETAIL w
+    WHERE w.CTELEMENTSID IN ({placeholders})
+"""
 
-def get_order_stats_all_positions(order_id):
-    if not order_id:
-        return None, None, None
+SQL_ORDER_BY_ORDERITEMSID = """
+    SELECT
+        o.ORDERNO,
+        o.PRODDATE,
+        o.ORDERID
+    FROM ORDERITEMS oi
+    INNER JOIN ORDERS o ON oi.ORDERID = o.ORDERID
+    WHERE oi.ORDERITEMSID = ?
+"""
 
-    query_order_stats = """
-        SELECT
-            SUM(wd.qty) as TOTAL,
-            SUM(CASE WHEN wd.isapproved = 1 THEN wd.qty ELSE 0 END) as APPROVED,
-            COUNT(CASE WHEN wd.isapproved = 0 THEN 1 END) as NOT_APPROVED_COUNT
-        FROM CT_WHDETAIL wd
-        JOIN CT_ELEMENTS el ON wd.CTELEMENTSID = el.CTELEMENTSID
-        LEFT JOIN ORDERITEMS oi ON el.ORDERITEMSID = oi.ORDERITEMSID
-        WHERE COALESCE(el.ORDERID, oi.ORDERID) = ?
-    """
+SQL_APPROVE_WHDETAIL_IDS = """
+    UPDATE CT_WHDETAIL
+    SET ISAPPROVED = 1,
+        DATEAPPROVED = CURRENT_TIMESTAMP
+    WHERE CTWHDETAILID IN ({placeholders}) AND COALESCE(ISAPPROVED, 0) <> 1
+"""
 
-    stats_result = db.execute_query(query_order_stats, (order_id,))
-    total_items_in_order = stats_result[0]['TOTAL'] if stats_result and stats_result[0]['TOTAL'] else 0
-    approved_items_in_order = stats_result[0]['APPROVED'] if stats_result and stats_result[0]['APPROVED'] else 0
-    not_approved_count = stats_result[0]['NOT_APPROVED_COUNT'] if stats_result and stats_result[0]['NOT_APPROVED_COUNT'] else 0
+SQL_GLASS_BY_ORDERITEMSID = """
+    SELECT
+        oi.ORDERITEMSID,
+        oi.NAME as GLASS_NAME,
+        oi.ORDERID,
+        o.ORDERNO,
+        o.PRODDATE
+    FROM ORDERITEMS oi
+    INNER JOIN ORDERS o ON oi.ORDERID = o.ORDERID
+    WHERE oi.ORDERITEMSID = ?
+"""
 
-    return total_items_in_order, approved_items_in_order, not_approved_count
+SQL_PRODUCT_BY_ORDER_AND_NAME = """
+    SELECT
+        oi.ORDERITEMSID,
+        oi.NAME as PRODUCT_NAME,
+        oi.QTY,
+        o.ORDERNO,
+        o.ORDERID,
+        o.PRODDATE
+    FROM ORDERITEMS oi
+    INNER JOIN ORDERS o ON oi.ORDERID = o.ORDERID
+    WHERE o.ORDERNO = ? AND oi.NAME = ?
+"""
 
+SQL_ANY_MODEL_BY_ORDERITEMSID = """
+    SELECT FIRST 1 MODELID
+    FROM MODELS
+    WHERE ORDERITEMSID = ?
+"""
+
+SQL_IZD_WHDETAIL_BY_ORDERITEMSID = """
+    SELECT
+        w.CTWHDETAILID,
+        w.CTELEMENTSID,
+        w.ITEMNO,
+        w.ISAPPROVED,
+        w.USERAPPROVED,
+        w.DATEAPPROVED,
+        e.RNAME as ELEMENT_NAME,
+        e.WIDTH,
+        e.HEIGHT,
+        e.MODELID,
+        (SELECT COUNT(*) FROM MODELS mc WHERE mc.ORDERITEMSID = m.ORDERITEMSID) as MODELS_COUNT
+    FROM MODELS m
+    INNER JOIN CT_ELEMENTS e ON e.MODELID = m.MODELID
+    INNER JOIN CT_WHDETAIL w ON w.CTELEMENTSID = e.CTELEMENTSID
+    WHERE m.ORDERITEMSID = ? AND w.ITEMNO = ? AND e.CTTYPEELEMSID = 2
+    ORDER BY m.MODELNO
+"""
+
+SQL_ORDER_BY_ID = """
+    SELECT
+        o.ORDERID,
+        TRIM(o.ORDERNO) as ORDERNO,
+        o.ORDERSTATEID,
+        TRIM(os.NAME) as STATE_NAME
+    FROM ORDERS o
+    LEFT JOIN ORDERSTATES os ON os.ORDERSTATEID = o.ORDERSTATEID
+    WHERE o.ORDERID = ?
+"""
+
+# Готовность заказа (все позиции) и статистика по позициям типа {condition_sql} за один проход
+SQL_ORDER_STATS_WITH_TYPE = """
+    SELECT
+        SUM(wd.qty) as TOTAL,
+        COUNT(CASE WHEN wd.isapproved = 0 THEN 1 END) as NOT_APPROVED_COUNT,
+        SUM(CASE WHEN {condition_sql} THEN wd.qty ELSE 0 END) as TYPE_TOTAL,
+        SUM(CASE WHEN {condition_sql} AND wd.isapproved = 1 THEN wd.qty ELSE 0 END) as TYPE_APPROVED
+    FROM CT_WHDETAIL wd
+    JOIN CT_ELEMENTS el ON wd.CTELEMENTSID = el.CTELEMENTSID
+    LEFT JOIN MODELS m ON el.MODELID = m.MODELID
+    LEFT JOIN ITEMSDETAIL idetail ON idetail.ITEMSDETAILID = el.ITEMSDETAILID
+    LEFT JOIN GROUPGOODS gg ON gg.GRGOODSID = idetail.GRGOODSID
+    LEFT JOIN ORDERITEMS oi ON el.ORDERITEMSID = oi.ORDERITEMSID
+    WHERE COALESCE(el.ORDERID, oi.ORDERID) = ?
+"""
 
-def _fetch_order_stats(order_id, condition_sql, params=None):
-    if not order_id:
-        return None, None, None
 
-    query_order_stats = f"""
+# === Статистика производства ===
+
+# Плановые и изготовленные изделия за период: агрегаты и соединения,
+# общие для отчета по дням и отчета по заказам. Принадлежность системы
+# к ПВХ / раздвижкам / стеклопакетам вычисляется один раз на строку R_SYSTEMS
+# (производная таблица rs), а не заново в каждом SUM.
+SQL_STATS_SUMS = """
+        SUM(rs.is_pvh) AS planned_pvh,
+        SUM(rs.is_razdv) AS planned_razdv,
+        SUM(rs.is_glass) AS planned_glass,
+        SUM(CASE WHEN wd.isapproved = 1 THEN rs.is_pvh ELSE 0 END) AS completed_pvh,
+        SUM(CASE WHEN wd.isapproved = 1 THEN rs.is_razdv ELSE 0 END) AS completed_razdv,
+        SUM(CASE WHEN wd.isapproved = 1 THEN rs.is_glass ELSE 0 END) AS completed_glass
+"""
+# "+0" запрещает оптимизатору входить в ORDERS по PK из ORDERITEMS и в MODELS
+# по индексу SYSPROFID из R_SYSTEMS: ведущей всегда остается ORDERS по диапазону
+# PRODDATE (LEFT JOIN элементов и склада и так фиксируют порядок)
+SQL_STATS_FROM = """
+    FROM orders o
+    JOIN orderitems oi ON oi.orderid = o.orderid + 0
+    JOIN models m ON m.orderitemsid = oi.orderitemsid
+    JOIN (
         SELECT
-            SUM(wd.qty) as TOTAL,
-            SUM(CASE WHEN wd.isapproved = 1 THEN wd.qty ELSE 0 END) as APPROVED,
-            COUNT(CASE WHEN wd.isapproved = 0 THEN 1 END) as NOT_APPROVED_COUNT
-        FROM CT_WHDETAIL wd
-        JOIN CT_ELEMENTS el ON wd.CTELEMENTSID = el.CTELEMENTSID
-        LEFT JOIN MODELS m ON el.MODELID = m.MODELID
-        LEFT JOIN ITEMSDETAIL idetail ON idetail.ITEMSDETAILID = el.ITEMSDETAILID
-        LEFT JOIN GROUPGOODS gg ON gg.GRGOODSID = idetail.GRGOODSID
-        LEFT JOIN ORDERITEMS oi ON el.ORDERITEMSID = oi.ORDERITEMSID
-        LEFT JOIN ORDERS o ON o.ORDERID = COALESCE(el.ORDERID, oi.ORDERID)
-        WHERE o.ORDERID = ?
-          AND {condition_sql}
-    """
+            rsystemid,
+            CASE WHEN systemtype = 0 AND rsystemid <> 8 AND rsystemid <> 27 THEN 1 ELSE 0 END AS is_pvh,
+            CASE WHEN systemtype = 1 OR rsystemid = 8 THEN 1 ELSE 0 END AS is_razdv,
+            CASE WHEN rsystemid = 28 THEN 1 ELSE 0 END AS is_glass
+        FROM r_systems
+    ) rs ON rs.rsystemid = m.sysprofid + 0
+    LEFT JOIN ct_elements el ON el.modelid = m.modelid AND el.cttypeelemsid = 2
+    LEFT JOIN ct_whdetail wd ON wd.ctelementsid = el.ctelementsid
+    WHERE o.proddate BETWEEN ? AND ?
+"""
 
-    query_params = [order_id]
-    if params:
-        query_params.extend(params)
+# Дата производства сразу приходит строкой ГГГГ-ММ-ДД (формат DATE -> VARCHAR в Firebird).
+# Отчеты группируются по этому столбцу (GROUP BY 1), чтобы время в PRODDATE не дробило день
+SQL_STATS_PRODDATE = "CAST(CAST(o.proddate AS DATE) AS VARCHAR(10)) AS proddate"
 
-    stats_result = db.execute_query(query_order_stats, tuple(query_params))
+SQL_STATS_BY_ORDER = (
+    "SELECT " + SQL_STATS_PRODDATE + ", TRIM(o.orderno) AS orderno, TRIM(o.rcomment) AS rcomment,"
+    + SQL_STATS_SUMS + SQL_STATS_FROM
+    + "GROUP BY 1, o.orderno, o.rcomment ORDER BY 1, o.orderno"
+)
 
-    total_items_in_order = stats_result[0]['TOTAL'] if stats_result and stats_result[0]['TOTAL'] else 0
-    approved_items_in_order = stats_result[0]['APPROVED'] if stats_result and stats_result[0]['APPROVED'] else 0
-    not_approved_count = stats_result[0]['NOT_APPROVED_COUNT'] if stats_result and stats_result[0]['NOT_APPROVED_COUNT'] else 0
+# Итоги по дням считаются на стороне сервера - вместо строки на каждый заказ
+SQL_STATS_BY_DAY = (
+    "SELECT " + SQL_STATS_PRODDATE + "," + SQL_STATS_SUMS + SQL_STATS_FROM
+    # Группировка по дате (первый столбец), а не по o.proddate: TIMESTAMP с разным
+    # временем внутри одного дня должен давать одну строку
+    + "GROUP BY 1 ORDER BY 1"
+)
 
-    return total_items_in_order, approved_items_in_order, not_approved_count
 
+def _log_worker(message: str) -> None:
+    logger.info("[ORDER-READY] %s", message)
 
-def get_order_stats(order_id):
-    return _fetch_order_stats(order_id, ORDER_STATS_ALL_CONDITION)
 
+def _strip(value: Optional[str], default: Optional[str] = None) -> Optional[str]:
+    """Обрезать пробелы у строкового поля из БД (CHAR дополняется пробелами)"""
+    return value.strip() if value else default
 
-def get_order_stats_by_type(order_id, stats_type, subtype_filter=None):
-    if not order_id:
-        return None, None
 
+# Поля ProductInfo - ответ собирается словарем той же формы, что и модель
+PRODUCT_INFO_FIELDS = tuple(ProductInfo.model_fields)
+# Целочисленные поля: fdb возвращает NUMERIC/DECIMAL как Decimal, DOUBLE как float,
+# а orjson не сериализует Decimal - приводим к int, как это делала модель
+PRODUCT_INFO_INT_FIELDS = tuple(
+    name for name, field in ProductInfo.model_fields.items() if field.annotation == Optional[int]
+)
+
+
+def _product_info(**fields) -> dict:
+    """Словарь ProductInfo: незаданные поля равны None, как у модели"""
+    info = dict.fromkeys(PRODUCT_INFO_FIELDS)
+    info.update(fields)
+    for name in PRODUCT_INFO_INT_FIELDS:
+        value = info[name]
+        if value is not None:
+            info[name] = int(value)
+    return info
+
+
+def _approval(success: bool, status: str, message: str, voice_message: str,
+              product_info: Optional[dict] = None) -> dict:
+    """Словарь ApprovalResponse (без построения модели - сериализуется orjson напрямую)"""
+    return {
+        "success": success,
+        "status": status,
+        "message": message,
+        "voice_message": voice_message,
+        "product_info": product_info,
+    }
+
+
+def _err(message: str, voice_message: str) -> dict:
+    """Ответ об ошибке без информации об изделии"""
+    return _approval(False, "error", message, voice_message)
+
+
+@lru_cache(maxsize=1024)
+def _format_date(value) -> str:
+    """Форматирование даты производства (ДД.ММ.ГГГГ); даты повторяются между сканами"""
+    # fdb возвращает PRODDATE как date/datetime - остальные типы только на всякий случай
+    try:
+        return value.strftime('%d.%m.%Y')
+    except AttributeError:
+        return str(value)
+
+
+def _format_datetime(value: datetime) -> str:
+    """Форматирование даты приходования (ДД.ММ.ГГГГ ЧЧ:ММ)"""
+    return value.strftime('%d.%m.%Y %H:%M')
+
+
+def _rows_to_dicts(cursor, rows):
+    columns = [desc[0] for desc in cursor.description]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _order_stats_condition(stats_type, subtype_filter=None):
     condition_sql = ORDER_STATS_FILTERS.get(stats_type)
     if not condition_sql:
-        total_items_in_order, approved_items_in_order, _ = get_order_stats(order_id)
-        return total_items_in_order, approved_items_in_order
+        return ORDER_STATS_ALL_CONDITION, []
 
-    params = None
+    params = []
     if stats_type == "material" and subtype_filter is not None:
         condition_sql = "(el.CTTYPEELEMSID = 1 AND gg.GGTYPEID IN (50, 42, 65) AND gg.GGTYPEID = ?)"
         params = [subtype_filter]
@@ -203,41 +508,15 @@ def get_order_stats_by_type(order_id, stats_type, subtype_filter=None):
         )
         params = [subtype_filter]
 
-    total_items_in_order, approved_items_in_order, _ = _fetch_order_stats(order_id, condition_sql, params)
-    return total_items_in_order, approved_items_in_order
+    return condition_sql, params
 
 
 def _set_order_ready(order_id, order_number=None):
     try:
-        current_state_query = """
-            SELECT orderstateid FROM orders WHERE orderid = ?
-        """
-        current_state = db.execute_query(current_state_query, (order_id,))
-        current_orderstateid = current_state[0]['ORDERSTATEID'] if current_state else None
-
-        if current_orderstateid != 4:
-            get_max_posit_query = """
-                SELECT MAX(stateposit) as MAXPOSIT
-                FROM orderstatesreg
-                WHERE orderid = ?
-            """
-            max_posit_result = db.execute_query(get_max_posit_query, (order_id,))
-            next_posit = (max_posit_result[0]['MAXPOSIT'] or 0) + 1
-
-            insert_state_query = """
-                INSERT INTO orderstatesreg
-                (orderstatesregid, orderid, orderstateid, empid, changedate, stateposit, rcomment)
-                VALUES (GEN_ID(GEN_ORDERSTATESREG, 1), ?, 4, 8, CURRENT_TIMESTAMP, ?, 'Автоматическая установка статуса после штрихкодирования')
-            """
-            db.execute_update(insert_state_query, (order_id, next_posit))
-
-            update_order_state_query = """
-                UPDATE orders
-                SET orderstateid = 4
-                WHERE orderid = ?
-            """
-            db.execute_update(update_order_state_query, (order_id,))
-
+        result = db.execute_procedure(
+            SQL_SET_ORDER_STATE, (order_id, ORDER_STATE_READY, ORDER_READY_COMMENT)
+        )
+        if result and result[0]['CHANGED']:
             _log_worker(f"Заказ {order_number or order_id} (ID={order_id}) переведен в статус 'Готов'")
             return True
     except Exception as e:
@@ -247,100 +526,48 @@ def _set_order_ready(order_id, order_number=None):
     return False
 
 
-def check_and_update_order_ready(order_id, order_number=None):
+def check_and_update_order_ready_with_stats(order_id, stats_type, subtype_filter=None, order_number=None):
+    """
+    Проверка готовности заказа и статистика по типу позиций одним запросом
+
+    Агрегаты по всем позициям заказа (для готовности) и по позициям нужного
+    типа (для ответа) считаются за один проход по CT_WHDETAIL.
+
+    Returns:
+        tuple: (order_ready, total_items_in_order, approved_items_in_order) по типу
+    """
     if not order_id:
-        return False, None, None, None
+        return False, None, None
 
-    total_items_in_order, approved_items_in_order, not_approved_count = get_order_stats_all_positions(order_id)
+    condition_sql, params = _order_stats_condition(stats_type, subtype_filter)
 
-    all_approved = (not_approved_count == 0)
-    has_items = (total_items_in_order > 0)
-    order_ready = all_approved and has_items
+    stats_result = db.execute_query(
+        SQL_ORDER_STATS_WITH_TYPE.format(condition_sql=condition_sql), (*params, *params, order_id)
+    )
+    stats_row = stats_result[0] if stats_result else {}
+    total_items_in_order = stats_row.get('TOTAL') or 0
+    not_approved_count = stats_row.get('NOT_APPROVED_COUNT') or 0
 
+    order_ready = (not_approved_count == 0) and (total_items_in_order > 0)
     if order_ready:
         _set_order_ready(order_id, order_number)
 
-    return order_ready, total_items_in_order, approved_items_in_order, not_approved_count
-
-
-def _fetch_ready_orders_for_update():
-    query_orders = """
-        SELECT o.ORDERID, o.ORDERNO
-        FROM ORDERS o
-        JOIN (
-            SELECT
-                COALESCE(el.ORDERID, oi.ORDERID) AS ORDERID,
-                SUM(wd.QTY) AS TOTAL_QTY,
-                SUM(CASE WHEN COALESCE(wd.ISAPPROVED, 0) = 0 THEN 1 ELSE 0 END) AS NOT_APPROVED_COUNT
-            FROM CT_WHDETAIL wd
-            JOIN CT_ELEMENTS el ON wd.CTELEMENTSID = el.CTELEMENTSID
-            LEFT JOIN ORDERITEMS oi ON el.ORDERITEMSID = oi.ORDERITEMSID
-            GROUP BY COALESCE(el.ORDERID, oi.ORDERID)
-        ) s ON s.ORDERID = o.ORDERID
-        WHERE o.DELETED = 0
-          AND o.ORDERSTATEID = 10
-          AND s.TOTAL_QTY > 0
-          AND s.NOT_APPROVED_COUNT = 0
-    """
-    return db.execute_query(query_orders)
-
-
-def _fetch_ready_orders_for_update_conn(cursor):
-    query_orders = """
-        SELECT o.ORDERID, o.ORDERNO
-        FROM ORDERS o
-        JOIN (
-            SELECT
-                COALESCE(el.ORDERID, oi.ORDERID) AS ORDERID,
-                SUM(wd.QTY) AS TOTAL_QTY,
-                SUM(CASE WHEN COALESCE(wd.ISAPPROVED, 0) = 0 THEN 1 ELSE 0 END) AS NOT_APPROVED_COUNT
-            FROM CT_WHDETAIL wd
-            JOIN CT_ELEMENTS el ON wd.CTELEMENTSID = el.CTELEMENTSID
-            LEFT JOIN ORDERITEMS oi ON el.ORDERITEMSID = oi.ORDERITEMSID
-            GROUP BY COALESCE(el.ORDERID, oi.ORDERID)
-        ) s ON s.ORDERID = o.ORDERID
-        WHERE o.DELETED = 0
-          AND o.ORDERSTATEID = 10
-          AND s.TOTAL_QTY > 0
-          AND s.NOT_APPROVED_COUNT = 0
-    """
-    cursor.execute(query_orders)
-    return _rows_to_dicts(cursor, cursor.fetchall())
+    return order_ready, stats_row.get('TYPE_TOTAL') or 0, stats_row.get('TYPE_APPROVED') or 0
 
 
-def _set_order_ready_conn(cursor, order_id, order_number=None):
-    current_state_query = """
-        SELECT orderstateid FROM orders WHERE orderid = ?
-    """
-    cursor.execute(current_state_query, (order_id,))
-    current_state = cursor.fetchone()
-    current_orderstateid = current_state[0] if current_state else None
+def _fetch_ready_orders_for_update_conn(cache):
+    cache.cursor.execute(cache.get(SQL_READY_ORDERS))
+    return _rows_to_dicts(cache.cursor, cache.cursor.fetchall())
 
-    if current_orderstateid == 4:
-        return False
 
-    get_max_posit_query = """
-        SELECT MAX(stateposit) as MAXPOSIT
-        FROM orderstatesreg
-        WHERE orderid = ?
-    """
-    cursor.execute(get_max_posit_query, (order_id,))
-    max_posit_result = cursor.fetchone()
-    next_posit = ((max_posit_result[0] or 0) if max_posit_result else 0) + 1
-
-    insert_state_query = """
-        INSERT INTO orderstatesreg
-        (orderstatesregid, orderid, orderstateid, empid, changedate, stateposit, rcomment)
-        VALUES (GEN_ID(GEN_ORDERSTATESREG, 1), ?, 4, 8, CURRENT_TIMESTAMP, ?, 'Автоматическая установка статуса после штрихкодирования')
-    """
-    cursor.execute(insert_state_query, (order_id, next_posit))
+def _set_order_ready_conn(cache, order_id, order_number=None):
+    cache.cursor.execute(
+        cache.get(SQL_SET_ORDER_STATE), (order_id, ORDER_STATE_READY, ORDER_READY_COMMENT)
+    )
+    result = cache.cursor.fetchone()
 
-    update_order_state_query = """
-        UPDATE orders
-        SET orderstateid = 4
-        WHERE orderid = ?
-    """
-    cursor.execute(update_order_state_query, (order_id,))
+    if not result or not result[0]:
+        return False
 
     _log_worker(f"Заказ {order_number or order_id} (ID={order_id}) переведен в статус 'Готов'")
     return True
@@ -351,19 +578,19 @@ def _order_ready_worker():
         _log_worker("Запуск цикла проверки готовности заказов")
         try:
             with db.get_connection() as conn:
-                cursor = conn.cursor()
-                orders = _fetch_ready_orders_for_update_conn(cursor)
-                _log_worker(f"Найдено готовых заказов: {len(orders)}")
-                updated = 0
-                for order in orders:
-                    try:
-                        if _set_order_ready_conn(cursor, order.get('ORDERID'), order.get('ORDERNO')):
-                            conn.commit()
+                # Запросы цикла берутся из кеша подготовленных запросов соединения
+                orders = _fetch_ready_orders_for_update_conn(db.get_statement_cache(conn))
+            _log_worker(f"Найдено готовых заказов: {len(orders)}")
+            updated = 0
+            for order in orders:
+                try:
+                    # Каждый заказ - отдельная транзакция (соединение берется из пула - обычно то же самое)
+                    with db.transaction() as order_cache:
+                        if _set_order_ready_conn(order_cache, order.get('ORDERID'), order.get('ORDERNO')):
                             updated += 1
-                    except Exception as exc:
-                        conn.rollback()
-                        _log_worker(f"Ошибка при обновлении готовности заказа {order.get('ORDERNO')}: {exc}")
-                _log_worker(f"Переведено в статус 'Готов': {updated}")
+                except Exception as exc:
+                    _log_worker(f"Ошибка при обновлении готовности заказа {order.get('ORDERNO')}: {exc}")
+            _log_worker(f"Переведено в статус 'Готов': {updated}")
         except Exception as exc:
             _log_worker(f"Ошибка при проверке готовности заказов: {exc}")
 
@@ -371,7 +598,7 @@ def _order_ready_worker():
         time.sleep(ORDER_READY_POLL_SECONDS)
 
 
-async def process_itm_barcode(barcode_value: str) -> ApprovalResponse:
+def process_itm_barcode(barcode_value: str) -> dict:
     """
     Обработка штрихкода материала (префикс T или ITM)
     Поиск CT_ELEMENTS по полю ITEMSDETAILID
@@ -380,194 +607,110 @@ async def process_itm_barcode(barcode_value: str) -> ApprovalResponse:
         barcode_value: ID материала (itemsdetailid)
 
     Returns:
-        ApprovalResponse с результатом операции
+        Словарь ApprovalResponse с результатом операции
     """
     try:
         itemsdetailid = int(barcode_value)
     except ValueError:
-        return ApprovalResponse(
-            success=False,
-            message=f"Некорректный ID материала: {barcode_value}",
-            voice_message="Ошибка. Некорректный ID материала",
-            product_info=None
-        )
+        return _err(f"Некорректный ID материала: {barcode_value}", "Ошибка. Некорректный ID материала")
 
-    # Находим элемент по ITEMSDETAILID
-    query_element = """
-        SELECT
-            e.CTELEMENTSID,
-            e.RNAME as ELEMENT_NAME,
-            e.WIDTH,
-            e.HEIGHT,
-            e.MODELID,
-            e.ORDERITEMSID,
-            e.ITEMSDETAILID,
-            gg.GGTYPEID as GGTYPEID,
-            ggt.NAME as GGTYPE_NAME
-        FROM CT_ELEMENTS e
-        LEFT JOIN ITEMSDETAIL idetail ON idetail.ITEMSDETAILID = e.ITEMSDETAILID
-        LEFT JOIN GROUPGOODS gg ON gg.GRGOODSID = idetail.GRGOODSID
-        LEFT JOIN GROUPGOODSTYPES ggt ON ggt.GGTYPEID = gg.GGTYPEID
-        WHERE e.ITEMSDETAILID = ?
-    """
-
-    element_result = db.execute_query(query_element, (itemsdetailid,))
+    # Находим элемент по ITEMSDETAILID вместе с заказом и записью CT_WHDETAIL
+    element_result = db.execute_query(SQL_ELEMENT_BY_ITEMSDETAILID, (itemsdetailid,))
 
     if not element_result:
-        return ApprovalResponse(
-            success=False,
-            message=f"Материал с ID {itemsdetailid} не найден",
-            voice_message="Материал не найден",
-            product_info=None
-        )
+        return _err(f"Материал с ID {itemsdetailid} не найден", "Материал не найден")
 
     element_data = element_result[0]
-    ctelementsid = element_data['CTELEMENTSID']
-    element_name = element_data['ELEMENT_NAME'].strip() if element_data['ELEMENT_NAME'] else None
-    material_group_name = element_data['GGTYPE_NAME'].strip() if element_data.get('GGTYPE_NAME') else None
-    material_group_id = element_data.get('GGTYPEID')
+    element_name = _strip(element_data['ELEMENT_NAME'])
+    material_group_name = _strip(element_data['GGTYPE_NAME'])
+    material_group_id = element_data['GGTYPEID']
+    construction_number = material_group_name or element_name
     width = element_data['WIDTH']
     height = element_data['HEIGHT']
     orderitems_id = element_data['ORDERITEMSID']
 
-    # Получаем информацию о заказе через ORDERITEMSID
-    order_number = None
-    proddate = None
-    order_id = None
+    # Информация о заказе (через ORDERITEMSID) пришла в том же запросе
+    order_number = _strip(element_data['ORDERNO'])
+    order_id = element_data['ORDERID']
     total_items_in_order = None
     approved_items_in_order = None
 
-    if orderitems_id:
-        query_order = """
-            SELECT
-                o.ORDERID,
-                o.ORDERNO,
-                o.PRODDATE
-            FROM ORDERITEMS oi
-            INNER JOIN ORDERS o ON oi.ORDERID = o.ORDERID
-            WHERE oi.ORDERITEMSID = ?
-        """
-        order_result = db.execute_query(query_order, (orderitems_id,))
-
-        if order_result:
-            order_data = order_result[0]
-            order_number = order_data['ORDERNO'].strip() if order_data['ORDERNO'] else None
-            order_id = order_data['ORDERID']
-
-            # Форматируем дату производства
-            proddate_raw = order_data.get('PRODDATE')
-            if proddate_raw:
-                if isinstance(proddate_raw, datetime):
-                    proddate = proddate_raw.strftime('%d.%m.%Y')
-                elif hasattr(proddate_raw, 'strftime'):
-                    proddate = proddate_raw.strftime('%d.%m.%Y')
-                else:
-                    proddate = str(proddate_raw)
-
-            # Получаем статистику по заказу
-    # Находим запись в CT_WHDETAIL
-    query_whdetail = """
-        SELECT
-            w.CTWHDETAILID,
-            w.ISAPPROVED,
-            w.DATEAPPROVED,
-            w.ITEMNO
-        FROM CT_WHDETAIL w
-        WHERE w.CTELEMENTSID = ?
-    """
-
-    whdetail_result = db.execute_query(query_whdetail, (ctelementsid,))
-
-    if not whdetail_result:
-        return ApprovalResponse(
-            success=False,
-            message=f"Запись на складе для материала {itemsdetailid} не найдена",
-            voice_message="Материал не найден на складе",
-            product_info=None
+    # Форматируем дату производства
+    proddate_raw = element_data['PRODDATE']
+    proddate = _format_date(proddate_raw) if proddate_raw else None
+
+    # Запись в CT_WHDETAIL
+    ctwhdetailid = element_data['CTWHDETAILID']
+    if ctwhdetailid is None:
+        return _err(
+            f"Запись на складе для материала {itemsdetailid} не найдена",
+            "Материал не найден на складе"
         )
 
-    whdetail_data = whdetail_result[0]
+    item_no = element_data['ITEMNO']
+
+    # Общие поля информации об изделии для обоих вариантов ответа
+    info_kwargs = dict(
+        order_number=order_number,
+        proddate=proddate,
+        construction_number=construction_number,
+        item_number=item_no,
+        orderitems_id=orderitems_id,
+        orderitems_name=element_name,
+        qty=None,
+        element_name=element_name,
+        width=width,
+        height=height,
+        glass_orderitems_id=None,
+        order_id=order_id
+    )
 
     # Проверяем, не приходован ли уже
-    if whdetail_data['ISAPPROVED'] == 1:
-        date_approved = whdetail_data['DATEAPPROVED']
+    if element_data['ISAPPROVED'] == 1:
+        date_approved = element_data['DATEAPPROVED']
         date_str = ""
-        check_and_update_order_ready(order_id, order_number)
-        total_items_in_order, approved_items_in_order = get_order_stats_by_type(
-            order_id, "material", material_group_id
+        _, total_items_in_order, approved_items_in_order = check_and_update_order_ready_with_stats(
+            order_id, "material", material_group_id, order_number
         )
         if date_approved:
-            date_str = f" (приходовано {date_approved.strftime('%d.%m.%Y %H:%M')})"
+            date_str = f" (приходовано {_format_datetime(date_approved)})"
 
-        return ApprovalResponse(
+        return _approval(
             success=False,
+            status="duplicate",
             message=f"Материал уже был отмечен готовым{date_str}",
             voice_message="Материал уже был отмечен готовым",
-            product_info=ProductInfo(
-                order_number=order_number,
-                proddate=proddate,
-                construction_number=material_group_name or element_name,
-                item_number=whdetail_data['ITEMNO'],
-                orderitems_id=orderitems_id,
-                orderitems_name=element_name,
-                qty=None,
-                element_name=element_name,
-                width=width,
-                height=height,
-                glass_orderitems_id=None,
-                order_id=order_id,
+            product_info=_product_info(
+                **info_kwargs,
                 total_items_in_order=total_items_in_order,
                 approved_items_in_order=approved_items_in_order
             )
         )
 
     # Приходуем материал
-    update_query = """
-        UPDATE CT_WHDETAIL
-        SET ISAPPROVED = 1,
-            DATEAPPROVED = CURRENT_TIMESTAMP
-        WHERE CTWHDETAILID = ?
-    """
-
-    rows_updated = db.execute_update(update_query, (whdetail_data['CTWHDETAILID'],))
+    rows_updated = db.execute_update(SQL_APPROVE_WHDETAIL, (ctwhdetailid,))
 
     if rows_updated == 0:
-        return ApprovalResponse(
-            success=False,
-            message="Не удалось обновить запись в базе данных",
-            voice_message="Ошибка при обновлении базы данных",
-            product_info=None
-        )
+        return _err("Не удалось обновить запись в базе данных", "Ошибка при обновлении базы данных")
 
-    check_and_update_order_ready(order_id, order_number)
-    total_items_in_order, approved_items_in_order = get_order_stats_by_type(
-        order_id, "material", material_group_id
+    _, total_items_in_order, approved_items_in_order = check_and_update_order_ready_with_stats(
+        order_id, "material", material_group_id, order_number
     )
 
-    return ApprovalResponse(
+    return _approval(
         success=True,
+        status="ok",
         message=f"Материал {element_name} успешно оприходован!",
         voice_message=f"Материал {element_name} готов",
-        product_info=ProductInfo(
-            order_number=order_number,
-            proddate=proddate,
-            construction_number=material_group_name or element_name,
-            item_number=whdetail_data['ITEMNO'],
-            orderitems_id=element_data['ORDERITEMSID'],
-            orderitems_name=element_name,
-            qty=None,
-            element_name=element_name,
-            width=width,
-            height=height,
-            glass_orderitems_id=None,
-            order_id=order_id,
+        product_info=_product_info(
+            **info_kwargs,
             total_items_in_order=total_items_in_order,
             approved_items_in_order=approved_items_in_order
         )
     )
 
 
-async def process_set_barcode(barcode_value: str) -> ApprovalResponse:
+def process_set_barcode(barcode_value: str) -> dict:
     """
     Обработка штрихкода набора (префикс S или SET)
     Поиск CT_ELEMENTS по полю ITEMSSETSID
@@ -576,74 +719,31 @@ async def process_set_barcode(barcode_value: str) -> ApprovalResponse:
         barcode_value: ID набора (itemssetid)
 
     Returns:
-        ApprovalResponse с результатом операции
+        Словарь ApprovalResponse с результатом операции
     """
     try:
         itemssetid = int(barcode_value)
     except ValueError:
-        return ApprovalResponse(
-            success=False,
-            message=f"Некорректный ID набора: {barcode_value}",
-            voice_message="Ошибка. Некорректный ID набора",
-            product_info=None
-        )
+        return _err(f"Некорректный ID набора: {barcode_value}", "Ошибка. Некорректный ID набора")
 
     # Находим элементы по ITEMSSETSID
-    query_elements = """
-        SELECT
-            e.CTELEMENTSID,
-            e.RNAME as ELEMENT_NAME,
-            e.WIDTH,
-            e.HEIGHT,
-            e.MODELID,
-            e.ORDERITEMSID,
-            e.ITEMSSETSID
-        FROM CT_ELEMENTS e
-        WHERE e.ITEMSSETSID = ?
-    """
-
-    elements_result = db.execute_query(query_elements, (itemssetid,))
+    elements_result = db.execute_query(SQL_ELEMENTS_BY_ITEMSSETSID, (itemssetid,))
 
     if not elements_result:
-        return ApprovalResponse(
-            success=False,
-            message=f"Набор с ID {itemssetid} не найден",
-            voice_message="Набор не найден",
-            product_info=None
-        )
-
-    # Получаем записи CT_WHDETAIL для всех элементов набора
-    whdetail_records = []
-    for element in elements_result:
-        ctelementsid = element['CTELEMENTSID']
+        return _err(f"Набор с ID {itemssetid} не найден", "Набор не найден")
 
-        query_whdetail = """
-            SELECT
-                w.CTWHDETAILID,
-                w.ISAPPROVED,
-                w.DATEAPPROVED,
-                w.ITEMNO,
-                w.CTELEMENTSID
-            FROM CT_WHDETAIL w
-            WHERE w.CTELEMENTSID = ?
-        """
+    # Получаем записи CT_WHDETAIL для всех элементов набора одним запросом
+    ctelementsids = [element['CTELEMENTSID'] for element in elements_result]
+    placeholders = ','.join('?' * len(ctelementsids))
 
-        whdetail_result = db.execute_query(query_whdetail, (ctelementsid,))
-
-        if whdetail_result:
-            whdetail_records.extend(whdetail_result)
+    whdetail_records = db.execute_query(SQL_WHDETAIL_BY_CTELEMENTSIDS.format(placeholders=placeholders), tuple(ctelementsids))
 
     if not whdetail_records:
-        return ApprovalResponse(
-            success=False,
-            message=f"Записи на складе для набора {itemssetid} не найдены",
-            voice_message="Набор не найден на складе",
-            product_info=None
-        )
+        return _err(f"Записи на складе для набора {itemssetid} не найдены", "Набор не найден на складе")
 
     # Берем первый элемент для отображения информации
     first_element = elements_result[0]
-    element_name = first_element['ELEMENT_NAME'].strip() if first_element['ELEMENT_NAME'] else None
+    element_name = _strip(first_element['ELEMENT_NAME'])
     set_display_name = element_name.split()[0] if element_name else None
     width = first_element['WIDTH']
     height = first_element['HEIGHT']
@@ -657,121 +757,86 @@ async def process_set_barcode(barcode_value: str) -> ApprovalResponse:
     approved_items_in_order = None
 
     if orderitems_id:
-        query_order = """
-            SELECT
-                o.ORDERNO,
-                o.PRODDATE,
-                o.ORDERID
-            FROM ORDERITEMS oi
-            INNER JOIN ORDERS o ON oi.ORDERID = o.ORDERID
-            WHERE oi.ORDERITEMSID = ?
-        """
-
-        order_result = db.execute_query(query_order, (orderitems_id,))
+        order_result = db.execute_query(SQL_ORDER_BY_ORDERITEMSID, (orderitems_id,))
 
         if order_result:
             order_data = order_result[0]
-            order_number = order_data['ORDERNO'].strip() if order_data['ORDERNO'] else None
+            order_number = _strip(order_data['ORDERNO'])
             proddate_obj = order_data['PRODDATE']
             if proddate_obj:
-                proddate = proddate_obj.strftime('%d.%m.%Y')
+                proddate = _format_date(proddate_obj)
             order_id = order_data['ORDERID']
 
-            # Получаем статистику по заказу (используем CT_WHDETAIL.isapproved)
-    # Проверяем, не приходованы ли уже ВСЕ записи
-    already_approved = [w for w in whdetail_records if w['ISAPPROVED'] == 1]
+    # Общие поля информации об изделии для обоих вариантов ответа
+    info_kwargs = dict(
+        order_number=order_number,
+        proddate=proddate,
+        construction_number=set_display_name,
+        item_number=None,
+        orderitems_id=orderitems_id,
+        orderitems_name=element_name,
+        qty=len(whdetail_records),
+        element_name=element_name,
+        width=width,
+        height=height,
+        glass_orderitems_id=None,
+        order_id=order_id
+    )
+
+    # Проверяем, не приходованы ли уже ВСЕ записи (один проход: собираем ещё не приходованные)
+    ids_to_update = [w['CTWHDETAILID'] for w in whdetail_records if w['ISAPPROVED'] != 1]
 
-    if len(already_approved) == len(whdetail_records):
+    if not ids_to_update:
         first_whdetail = whdetail_records[0]
         date_approved = first_whdetail['DATEAPPROVED']
         date_str = ""
-        check_and_update_order_ready(order_id, order_number)
-        total_items_in_order, approved_items_in_order = get_order_stats_by_type(
-            order_id, "set", set_display_name
+        _, total_items_in_order, approved_items_in_order = check_and_update_order_ready_with_stats(
+            order_id, "set", set_display_name, order_number
         )
         if date_approved:
-            date_str = f" (приходовано {date_approved.strftime('%d.%m.%Y %H:%M')})"
+            date_str = f" (приходовано {_format_datetime(date_approved)})"
 
-        return ApprovalResponse(
+        return _approval(
             success=False,
+            status="duplicate",
             message=f"Набор уже было отмечено готовым{date_str}",
             voice_message="Набор уже было отмечено готовым",
-            product_info=ProductInfo(
-                order_number=order_number,
-                proddate=proddate,
-                construction_number=set_display_name,
-                item_number=None,
-                orderitems_id=first_element['ORDERITEMSID'],
-                orderitems_name=element_name,
-                qty=len(whdetail_records),
-                element_name=element_name,
-                width=width,
-                height=height,
-                glass_orderitems_id=None,
-                order_id=order_id,
+            product_info=_product_info(
+                **info_kwargs,
                 total_items_in_order=total_items_in_order,
                 approved_items_in_order=approved_items_in_order
             )
         )
 
-    # Приходуем ВСЕ элементы набора
-    total_updated = 0
-    for whdetail in whdetail_records:
-        # Пропускаем уже приходованные
-        if whdetail['ISAPPROVED'] == 1:
-            continue
-
-        update_query = """
-            UPDATE CT_WHDETAIL
-            SET ISAPPROVED = 1,
-                DATEAPPROVED = CURRENT_TIMESTAMP
-            WHERE CTWHDETAILID = ?
-        """
-
-        rows_updated = db.execute_update(update_query, (whdetail['CTWHDETAILID'],))
-        total_updated += rows_updated
+    # Приходуем ВСЕ элементы набора одним запросом (уже приходованные пропускаем)
+    placeholders = ','.join('?' * len(ids_to_update))
+    total_updated = db.execute_update(SQL_APPROVE_WHDETAIL_IDS.format(placeholders=placeholders), tuple(ids_to_update))
 
     if total_updated == 0:
-        return ApprovalResponse(
-            success=False,
-            message="Не удалось обновить записи в базе данных",
-            voice_message="Ошибка при обновлении базы данных",
-            product_info=None
-        )
+        return _err("Не удалось обновить записи в базе данных", "Ошибка при обновлении базы данных")
 
-    check_and_update_order_ready(order_id, order_number)
-    total_items_in_order, approved_items_in_order = get_order_stats_by_type(
-        order_id, "set", set_display_name
+    _, total_items_in_order, approved_items_in_order = check_and_update_order_ready_with_stats(
+        order_id, "set", set_display_name, order_number
     )
     message = f"Успешно оприходовано {total_updated} элемент(ов) набора"
     if total_updated < len(whdetail_records):
         already_count = len(whdetail_records) - total_updated
         message += f" ({already_count} уже было приходовано ранее)"
 
-    return ApprovalResponse(
+    return _approval(
         success=True,
+        status="ok",
         message=message,
         voice_message=f"Набор {element_name} готов",
-        product_info=ProductInfo(
-            order_number=order_number,
-            proddate=proddate,
-            construction_number=set_display_name,
-            item_number=None,
-            orderitems_id=first_element['ORDERITEMSID'],
-            orderitems_name=element_name,
-            qty=len(whdetail_records),
-            element_name=element_name,
-            width=width,
-            height=height,
-            glass_orderitems_id=None,
-            order_id=order_id,
+        product_info=_product_info(
+            **info_kwargs,
             total_items_in_order=total_items_in_order,
             approved_items_in_order=approved_items_in_order
         )
     )
 
 
-async def process_izd_barcode(barcode_value: str) -> ApprovalResponse:
+def process_izd_barcode(barcode_value: str) -> dict:
     """
     Обработка штрихкода изделия (префикс D, IZD или старый формат 9 цифр)
 
@@ -783,15 +848,13 @@ async def process_izd_barcode(barcode_value: str) -> ApprovalResponse:
         barcode_value: 9 цифр штрихкода изделия
 
     Returns:
-        ApprovalResponse с результатом операции
+        Словарь ApprovalResponse с результатом операции
     """
     # Валидация: должно быть 9 цифр
     if not barcode_value.isdigit() or len(barcode_value) != 9:
-        return ApprovalResponse(
-            success=False,
-            message=f"Некорректный штрихкод изделия: {barcode_value}. Ожидается 9 цифр",
-            voice_message="Ошибка. Некорректный штрихкод изделия",
-            product_info=None
+        return _err(
+            f"Некорректный штрихкод изделия: {barcode_value}. Ожидается 9 цифр",
+            "Ошибка. Некорректный штрихкод изделия"
         )
 
     # Парсим штрихкод
@@ -799,228 +862,129 @@ async def process_izd_barcode(barcode_value: str) -> ApprovalResponse:
     glass_orderitems_id = int(barcode_value[2:])  # Остальные 7 цифр - ORDERITEMSID стеклопакета
 
     # 1. Находим ORDERITEMS стеклопакета по его ID
-    query_glass = """
-        SELECT
-            oi.ORDERITEMSID,
-            oi.NAME as GLASS_NAME,
-            oi.ORDERID,
-            o.ORDERNO,
-            o.PRODDATE
-        FROM ORDERITEMS oi
-        INNER JOIN ORDERS o ON oi.ORDERID = o.ORDERID
-        WHERE oi.ORDERITEMSID = ?
-    """
-
-    glass_result = db.execute_query(query_glass, (glass_orderitems_id,))
+    glass_result = db.execute_query(SQL_GLASS_BY_ORDERITEMSID, (glass_orderitems_id,))
 
     if not glass_result:
-        return ApprovalResponse(
-            success=False,
-            message=f"Стеклопакет с ID {glass_orderitems_id} не найден в базе данных",
-            voice_message="Стеклопакет не найден в базе данных",
-            product_info=None
+        return _err(
+            f"Стеклопакет с ID {glass_orderitems_id} не найден в базе данных",
+            "Стеклопакет не найден в базе данных"
         )
 
     glass_data = glass_result[0]
-    glass_name = glass_data['GLASS_NAME'].strip() if glass_data['GLASS_NAME'] else ""
+    glass_name = _strip(glass_data['GLASS_NAME'], "")
 
     # 2. Парсим NAME стеклопакета: "19686 / 01 / С-1 [G 2 665]"
     # Формат: [номер заказа] / [номер изделия] / [проём] [...]
-    if not glass_name or '/' not in glass_name:
-        return ApprovalResponse(
-            success=False,
-            message=f"Некорректный формат имени стеклопакета: {glass_name}",
-            voice_message="Ошибка. Некорректный формат имени стеклопакета",
-            product_info=None
-        )
-
-    parts = glass_name.split('/')
-    if len(parts) < 2:
-        return ApprovalResponse(
-            success=False,
-            message=f"Не удалось распарсить имя стеклопакета: {glass_name}",
-            voice_message="Ошибка парсинга имени стеклопакета",
-            product_info=None
+    glass_name_match = GLASS_NAME_RE.match(glass_name)
+    if not glass_name_match:
+        return _err(
+            f"Некорректный формат имени стеклопакета: {glass_name}",
+            "Ошибка. Некорректный формат имени стеклопакета"
         )
 
-    order_name = parts[0].strip()  # "19686"
-    construction_number = parts[1].strip()  # "01"
+    order_name, construction_number = glass_name_match.groups()  # "19686", "01"
 
     # 3. Находим ORDERITEMSID изделия по названию заказа и номеру конструкции
-    query_product = """
-        SELECT
-            oi.ORDERITEMSID,
-            oi.NAME as PRODUCT_NAME,
-            oi.QTY,
-            o.ORDERNO,
-            o.ORDERID,
-            o.PRODDATE
-        FROM ORDERITEMS oi
-        INNER JOIN ORDERS o ON oi.ORDERID = o.ORDERID
-        WHERE o.ORDERNO = ? AND oi.NAME = ?
-    """
-
-    product_result = db.execute_query(query_product, (order_name, construction_number))
+    product_result = db.execute_query(SQL_PRODUCT_BY_ORDER_AND_NAME, (order_name, construction_number))
 
     if not product_result:
-        return ApprovalResponse(
-            success=False,
-            message=f"Изделие {construction_number} заказа №{order_name} не найдено",
-            voice_message=f"Изделие {construction_number} заказа №{order_name} не найдено",
-            product_info=None
+        return _err(
+            f"Изделие {construction_number} заказа №{order_name} не найдено",
+            f"Изделие {construction_number} заказа №{order_name} не найдено"
         )
 
     product_data = product_result[0]
     orderitems_id = product_data['ORDERITEMSID']
-    order_number = product_data['ORDERNO'].strip() if product_data['ORDERNO'] else "?"
+    order_number = _strip(product_data['ORDERNO'], "?")
     orderitem_qty = product_data['QTY']
     order_id = product_data['ORDERID']
 
     # Форматируем дату производства
-    proddate_raw = product_data.get('PRODDATE')
-    proddate = None
-    if proddate_raw:
-        if isinstance(proddate_raw, datetime):
-            proddate = proddate_raw.strftime('%d.%m.%Y')
-        elif hasattr(proddate_raw, 'strftime'):
-            proddate = proddate_raw.strftime('%d.%m.%Y')
-        else:
-            proddate = str(proddate_raw)
+    proddate_raw = product_data['PRODDATE']
+    proddate = _format_date(proddate_raw) if proddate_raw else None
 
     # Проверяем, что номер изделия не превышает количество
     if item_number > orderitem_qty:
-        return ApprovalResponse(
-            success=False,
-            message=f"Номер изделия {item_number} превышает количество {orderitem_qty}",
-            voice_message=f"Ошибка. Номер изделия {item_number} превышает количество {orderitem_qty}",
-            product_info=None
+        return _err(
+            f"Номер изделия {item_number} превышает количество {orderitem_qty}",
+            f"Ошибка. Номер изделия {item_number} превышает количество {orderitem_qty}"
         )
 
-    # 4. Находим ВСЕ модели для данного ORDERITEMSID
-    query_models = """
-        SELECT MODELID, MODELNO
-        FROM MODELS
-        WHERE ORDERITEMSID = ?
-        ORDER BY MODELNO
-    """
-
-    models_result = db.execute_query(query_models, (orderitems_id,))
-
-    if not models_result:
-        return ApprovalResponse(
-            success=False,
-            message=f"Модели для изделия {construction_number} заказа №{order_number} не найдены",
-            voice_message=f"Модели для изделия {construction_number} заказа №{order_number} не найдены",
-            product_info=None
-        )
-
-    # 5. Для каждой модели находим CT_ELEMENTS и CT_WHDETAIL с нужным ITEMNO
-    whdetail_records = []
-    for model in models_result:
-        model_id = model['MODELID']
-
-        query_whdetail = """
-            SELECT
-                w.CTWHDETAILID,
-                w.CTELEMENTSID,
-                w.ITEMNO,
-                w.ISAPPROVED,
-                w.USERAPPROVED,
-                w.DATEAPPROVED,
-                e.RNAME as ELEMENT_NAME,
-                e.WIDTH,
-                e.HEIGHT,
-                e.MODELID
-            FROM CT_WHDETAIL w
-            INNER JOIN CT_ELEMENTS e ON w.CTELEMENTSID = e.CTELEMENTSID
-            WHERE e.MODELID = ? AND w.ITEMNO = ? AND e.CTTYPEELEMSID = 2
-        """
-
-        whdetail_result = db.execute_query(query_whdetail, (model_id, item_number))
-
-        if whdetail_result:
-            whdetail_records.extend(whdetail_result)
+    # 4-5. Для всех моделей ORDERITEMSID одним запросом находим CT_ELEMENTS и CT_WHDETAIL с нужным ITEMNO
+    whdetail_records = db.execute_query(SQL_IZD_WHDETAIL_BY_ORDERITEMSID, (orderitems_id, item_number))
 
     if not whdetail_records:
-        return ApprovalResponse(
-            success=False,
-            message=f"Изделие {construction_number} заказа №{order_number} не найдено на складе",
-            voice_message=f"Изделие {construction_number} заказа №{order_number} не найдено на складе",
-            product_info=None
+        # Уточняем причину только на пути ошибки: нет моделей или нет записей на складе
+        if not db.execute_query(SQL_ANY_MODEL_BY_ORDERITEMSID, (orderitems_id,)):
+            return _err(
+                f"Модели для изделия {construction_number} заказа №{order_number} не найдены",
+                f"Модели для изделия {construction_number} заказа №{order_number} не найдены"
+            )
+
+        return _err(
+            f"Изделие {construction_number} заказа №{order_number} не найдено на складе",
+            f"Изделие {construction_number} заказа №{order_number} не найдено на складе"
         )
 
     # Берем данные из первой записи для информации
     whdetail_data = whdetail_records[0]
-    element_name = whdetail_data['ELEMENT_NAME'].strip() if whdetail_data['ELEMENT_NAME'] else None
+    element_name = _strip(whdetail_data['ELEMENT_NAME'])
     width = whdetail_data['WIDTH']
     height = whdetail_data['HEIGHT']
 
-    # 6. Проверяем, не приходованы ли уже ВСЕ записи
-    already_approved = [w for w in whdetail_records if w['ISAPPROVED'] == 1]
+    # Общие поля информации об изделии для обоих вариантов ответа
+    info_kwargs = dict(
+        order_number=order_number,
+        proddate=proddate,
+        construction_number=construction_number,
+        item_number=item_number,
+        orderitems_id=orderitems_id,
+        orderitems_name=construction_number,
+        qty=orderitem_qty,
+        element_name=element_name,
+        width=width,
+        height=height,
+        glass_orderitems_id=glass_orderitems_id,
+        order_id=order_id
+    )
 
-    if len(already_approved) == len(whdetail_records):
+    # 6. Проверяем, не приходованы ли уже ВСЕ записи (один проход: собираем ещё не приходованные)
+    ids_to_update = [w['CTWHDETAILID'] for w in whdetail_records if w['ISAPPROVED'] != 1]
+
+    if not ids_to_update:
         date_approved = whdetail_data['DATEAPPROVED']
         date_str = ""
-        check_and_update_order_ready(order_id, order_number)
-        total_items_in_order, approved_items_in_order = get_order_stats_by_type(order_id, "product")
+        _, total_items_in_order, approved_items_in_order = check_and_update_order_ready_with_stats(
+            order_id, "product", order_number=order_number
+        )
         if date_approved:
-            date_str = f" (приходовано {date_approved.strftime('%d.%m.%Y %H:%M')})"
+            date_str = f" (приходовано {_format_datetime(date_approved)})"
 
-        # Получаем статистику по заказу для уже приходованного изделия
-
-        return ApprovalResponse(
+        return _approval(
             success=False,
+            status="duplicate",
             message=f"Изделие уже было отмечено готовым{date_str}",
             voice_message="Изделие уже было отмечено готовым",
-            product_info=ProductInfo(
-                order_number=order_number,
-                proddate=proddate,
-                construction_number=construction_number,
-                item_number=item_number,
-                orderitems_id=orderitems_id,
-                orderitems_name=construction_number,
-                qty=orderitem_qty,
-                element_name=element_name,
-                width=width,
-                height=height,
-                glass_orderitems_id=glass_orderitems_id,
-                order_id=order_id,
+            product_info=_product_info(
+                **info_kwargs,
                 total_items_in_order=total_items_in_order,
                 approved_items_in_order=approved_items_in_order
             )
         )
 
-    # 7. Приходуем ВСЕ изделия - обновляем CT_WHDETAIL для всех моделей
-    total_updated = 0
-    for whdetail in whdetail_records:
-        # Пропускаем уже приходованные
-        if whdetail['ISAPPROVED'] == 1:
-            continue
-
-        update_query = """
-            UPDATE CT_WHDETAIL
-            SET ISAPPROVED = 1,
-                DATEAPPROVED = CURRENT_TIMESTAMP
-            WHERE CTWHDETAILID = ?
-        """
-
-        rows_updated = db.execute_update(update_query, (whdetail['CTWHDETAILID'],))
-        total_updated += rows_updated
+    # 7. Приходуем ВСЕ изделия - обновляем CT_WHDETAIL для всех моделей одним запросом (уже приходованные пропускаем)
+    placeholders = ','.join('?' * len(ids_to_update))
+    total_updated = db.execute_update(SQL_APPROVE_WHDETAIL_IDS.format(placeholders=placeholders), tuple(ids_to_update))
 
     if total_updated == 0:
-        return ApprovalResponse(
-            success=False,
-            message="Не удалось обновить записи в базе данных",
-            voice_message="Ошибка при обновлении базы данных",
-            product_info=None
-        )
+        return _err("Не удалось обновить записи в базе данных", "Ошибка при обновлении базы данных")
 
-    order_id = product_data['ORDERID']
-    order_ready, _, _, _ = check_and_update_order_ready(order_id, order_number)
-    total_items_in_order, approved_items_in_order = get_order_stats_by_type(order_id, "product")
+    order_ready, total_items_in_order, approved_items_in_order = check_and_update_order_ready_with_stats(
+        order_id, "product", order_number=order_number
+    )
 
     # 10. Формируем успешный ответ
-    models_count = len(models_result)
+    models_count = whdetail_data['MODELS_COUNT']
     voice_message = f"Изделие {construction_number} заказа {order_number} готово"
 
     message = f"Успешно оприходовано {total_updated} изделие(й) из {models_count} модели(ей)"
@@ -1033,30 +997,20 @@ async def process_izd_barcode(barcode_value: str) -> ApprovalResponse:
         message += f". ЗАКАЗ {order_number} ПОЛНОСТЬЮ ГОТОВ!"
         voice_message = f"Заказ {order_number} полностью готов!"
 
-    return ApprovalResponse(
+    return _approval(
         success=True,
+        status="ok",
         message=message,
         voice_message=voice_message,
-        product_info=ProductInfo(
-            order_number=order_number,
-            proddate=proddate,
-            construction_number=construction_number,
-            item_number=item_number,
-            orderitems_id=orderitems_id,
-            orderitems_name=construction_number,
-            qty=orderitem_qty,
-            element_name=element_name,
-            width=width,
-            height=height,
-            glass_orderitems_id=glass_orderitems_id,
-            order_id=order_id,
+        product_info=_product_info(
+            **info_kwargs,
             total_items_in_order=total_items_in_order,
             approved_items_in_order=approved_items_in_order
         )
     )
 
 
-async def process_order_barcode(barcode: str) -> ApprovalResponse:
+def process_order_barcode(barcode: str) -> dict:
     """
     Обработка штрихкода заказа для перевода в статус "Отгружен"
 
@@ -1064,187 +1018,184 @@ async def process_order_barcode(barcode: str) -> ApprovalResponse:
         barcode: ORDERID заказа
 
     Returns:
-        ApprovalResponse с результатом операции
+        Словарь ApprovalResponse с результатом операции
     """
     try:
         order_id = int(barcode)
     except ValueError:
-        return ApprovalResponse(
-            success=False,
-            message=f"Некорректный штрихкод заказа: {barcode}",
-            voice_message="Ошибка. Некорректный штрихкод заказа",
-            product_info=None
-        )
+        return _err(f"Некорректный штрихкод заказа: {barcode}", "Ошибка. Некорректный штрихкод заказа")
 
     # Проверяем существование заказа и его текущий статус
-    query_order = """
-        SELECT
-            o.ORDERID,
-            o.ORDERNO,
-            o.ORDERSTATEID,
-            os.NAME as STATE_NAME
-        FROM ORDERS o
-        LEFT JOIN ORDERSTATES os ON os.ORDERSTATEID = o.ORDERSTATEID
-        WHERE o.ORDERID = ?
-    """
-
-    order_result = db.execute_query(query_order, (order_id,))
+    order_result = db.execute_query(SQL_ORDER_BY_ID, (order_id,))
 
     if not order_result:
-        return ApprovalResponse(
-            success=False,
-            message=f"Заказ с ID {order_id} не найден",
-            voice_message="Заказ не найден",
-            product_info=None
-        )
+        return _err(f"Заказ с ID {order_id} не найден", "Заказ не найден")
 
     order_data = order_result[0]
-    order_number = order_data['ORDERNO'].strip() if order_data['ORDERNO'] else "?"
+    order_number = order_data['ORDERNO'] or "?"
     current_state_id = order_data['ORDERSTATEID']
-    current_state_name = order_data['STATE_NAME'].strip() if order_data['STATE_NAME'] else "Неизвестно"
+    current_state_name = order_data['STATE_NAME'] or "Неизвестно"
+
+    product_info = _product_info(order_number=order_number, order_id=order_id)
 
     # Уточняем статус заказа: готов / еще не готов / уже отгружен
-    if current_state_id == 5:
-        return ApprovalResponse(
+    if current_state_id == ORDER_STATE_SHIPPED:
+        return _approval(
             success=False,
+            status="already_shipped",
             message=f"Заказ {order_number} уже отмечен отгруженным",
             voice_message=f"Заказ {order_number} уже отгружен",
-            product_info=ProductInfo(
-                order_number=order_number,
-                proddate=None,
-                construction_number=None,
-                item_number=None,
-                orderitems_id=None,
-                orderitems_name=None,
-                qty=None,
-                element_name=None,
-                width=None,
-                height=None,
-                glass_orderitems_id=None,
-                order_id=order_id,
-                total_items_in_order=None,
-                approved_items_in_order=None
-            )
+            product_info=product_info
         )
 
     # Проверяем, что заказ в статусе "Готов" (ID=4)
-    if current_state_id != 4:
-        return ApprovalResponse(
+    if current_state_id != ORDER_STATE_READY:
+        return _approval(
             success=False,
+            status="not_ready",
             message=f"Заказ {order_number} в статусе '{current_state_name}'. Заказ еще не готов к отгрузке",
             voice_message=f"Заказ {order_number} еще не готов к отгрузке",
-            product_info=ProductInfo(
-                order_number=order_number,
-                proddate=None,
-                construction_number=None,
-                item_number=None,
-                orderitems_id=None,
-                orderitems_name=None,
-                qty=None,
-                element_name=None,
-                width=None,
-                height=None,
-                glass_orderitems_id=None,
-                order_id=order_id,
-                total_items_in_order=None,
-                approved_items_in_order=None
-            )
+            product_info=product_info
         )
 
-    # Переводим заказ в статус "Отгружен" (ID=5)
+    # Переводим заказ в статус "Отгружен" (ID=5): запись в ORDERSTATESREG
+    # и обновление ORDERS выполняются одним запросом в одной транзакции
     try:
-        # Получаем максимальную позицию состояния для данного заказа
-        get_max_posit_query = """
-            SELECT MAX(stateposit) as MAXPOSIT
-            FROM orderstatesreg
-            WHERE orderid = ?
-        """
-        max_posit_result = db.execute_query(get_max_posit_query, (order_id,))
-        next_posit = (max_posit_result[0]['MAXPOSIT'] or 0) + 1
-
-        # Добавляем запись в ORDERSTATESREG, используя генератор для ID
-        # EMPID = 8 (как в примере из базы, "Скрипт sChangeState")
-        insert_state_query = """
-            INSERT INTO orderstatesreg
-            (orderstatesregid, orderid, orderstateid, empid, changedate, stateposit, rcomment)
-            VALUES (GEN_ID(GEN_ORDERSTATESREG, 1), ?, 5, 8, CURRENT_TIMESTAMP, ?, 'Автоматическая установка статуса "Отгружен" после сканирования штрихкода заказа')
-        """
-        db.execute_update(insert_state_query, (order_id, next_posit))
-
-        # Обновляем состояние заказа
-        update_order_state_query = """
-            UPDATE orders
-            SET orderstateid = 5
-            WHERE orderid = ?
-        """
-        db.execute_update(update_order_state_query, (order_id,))
-
-        print(f"[OK] Заказ {order_number} (ID={order_id}) переведен в статус 'Отгружен'")
-
-        return ApprovalResponse(
+        result = db.execute_procedure(
+            SQL_SET_ORDER_STATE, (order_id, ORDER_STATE_SHIPPED, ORDER_SHIPPED_COMMENT)
+        )
+
+        # Параллельное сканирование того же заказа уже успело его отгрузить
+        if not (result and result[0]['CHANGED']):
+            return _approval(
+                success=False,
+                status="already_shipped",
+                message=f"Заказ {order_number} уже отмечен отгруженным",
+                voice_message=f"Заказ {order_number} уже отгружен",
+                product_info=product_info
+            )
+
+        logger.info("Заказ %s (ID=%s) переведен в статус 'Отгружен'", order_number, order_id)
+
+        return _approval(
             success=True,
+            status="ok",
             message=f"Заказ {order_number} успешно отгружен!",
             voice_message=f"Заказ {order_number} отгружен",
-            product_info=ProductInfo(
-                order_number=order_number,
-                proddate=None,
-                construction_number=None,
-                item_number=None,
-                orderitems_id=None,
-                orderitems_name=None,
-                qty=None,
-                element_name=None,
-                width=None,
-                height=None,
-                glass_orderitems_id=None,
-                order_id=order_id,
-                total_items_in_order=None,
-                approved_items_in_order=None
-            )
+            product_info=product_info
         )
 
     except Exception as e:
-        print(f"[ERROR] Ошибка при установке статуса 'Отгружен' для заказа {order_number}: {e}")
-        return ApprovalResponse(
-            success=False,
-            message=f"Ошибка при отгрузке заказа: {str(e)}",
-            voice_message="Ошибка при отгрузке заказа",
-            product_info=None
-        )
+        logger.error("Ошибка при установке статуса 'Отгружен' для заказа %s: %s", order_number, e)
+        return _err(f"Ошибка при отгрузке заказа: {str(e)}", "Ошибка при отгрузке заказа")
+
+
+# Обработчики по типу штрихкода (тип определяет parse_barcode)
+BARCODE_HANDLERS = {
+    'IZD': process_izd_barcode,
+    'LEGACY_IZD': process_izd_barcode,
+    'ORD': process_order_barcode,
+    'LEGACY_ORD': process_order_barcode,
+    'ITM': process_itm_barcode,
+    'SET': process_set_barcode,
+}
 
 
-@app.get("/", response_model=HealthResponse)
-async def health_check():
-    """Проверка работоспособности API и подключения к БД"""
+def _handle_barcode(barcode: str) -> dict:
+    """Разбор штрихкода и выполнение обработчика на одном соединении из пула"""
     try:
-        print(f"Попытка подключения к БД: {settings.DB_HOST}:{settings.DB_PORT}")
-        print(f"База данных: {settings.DB_DATABASE}")
+        barcode = barcode.strip()
 
-        # Проверяем подключение к БД
-        result = db.execute_query("SELECT 1 FROM RDB$DATABASE")
-        db_connected = len(result) > 0
+        # Парсим штрихкод и определяем тип
+        barcode_info = parse_barcode(barcode)
+        barcode_type = barcode_info['type']
+        barcode_value = barcode_info['value']
 
-        print(f"[OK] Подключение к БД успешно, результат: {result}")
+        logger.info("Обработка штрихкода: type=%s, value=%s", barcode_type, barcode_value)
 
-        return HealthResponse(
-            status="ok" if db_connected else "error",
-            database_connected=db_connected,
-            api_version=app.version
-        )
+        # Маршрутизация по типу штрихкода
+        handler = BARCODE_HANDLERS.get(barcode_type)
+        if handler is None:  # UNKNOWN
+            return _err(f"Неизвестный формат штрихкода: {barcode}", "Ошибка. Неизвестный формат штрихкода")
+
+        with db.get_connection():
+            return handler(barcode_value)
+
+    except ValueError as e:
+        return _err(f"Ошибка обработки штрихкода: {str(e)}", "Ошибка обработки штрихкода")
+    except fdb.DatabaseError as e:
+        return _err(f"Ошибка базы данных: {str(e)}", "Ошибка базы данных")
     except Exception as e:
-        print(f"[ERROR] Ошибка подключения к БД: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-
-        return HealthResponse(
-            status="error",
-            database_connected=False,
-            api_version=app.version
-        )
+        return _err(f"Неизвестная ошибка: {str(e)}", "Неизвестная ошибка")
+
 
+def _handle_barcode_batch(barcodes: list) -> list:
+    """Обработка пакета штрихкодов по порядку в одном рабочем потоке"""
+    return [_handle_barcode(barcode) for barcode in barcodes]
+
+
+def _read_json_body(body: bytes):
+    """Разбор тела запроса (None, если это не JSON)"""
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def _is_barcode(value) -> bool:
+    """Штрихкод в теле запроса: строка из символов ASCII (формат проверяет parse_barcode)"""
+    return isinstance(value, str) and value.isascii()
+
+
+def _bad_request(detail: str) -> ORJSONResponse:
+    """Ответ 400 на некорректное тело запроса (оба endpoint штрихкодов отвечают одинаково)"""
+    return ORJSONResponse(status_code=400, content={"detail": detail})
+
+
+HEALTH_CACHE_TTL_SECONDS = 2.0
+SQL_HEALTH_CHECK = "SELECT 1 FROM RDB$DATABASE"
+
+# Результат последней проверки БД (частые опросы не нагружают базу)
+_health_cache = {'ts': 0.0, 'ok': False}
+
+
+@app.get("/", response_model=HealthResponse)
+async def health_check():
+    """Проверка работоспособности API и подключения к БД"""
+    now = time.monotonic()
+    if now - _health_cache['ts'] >= HEALTH_CACHE_TTL_SECONDS:
+        try:
+            db_connected = len(await run_in_threadpool(db.execute_query, SQL_HEALTH_CHECK)) > 0
+        except Exception as e:
+            logger.error(
+                "Ошибка подключения к БД %s:%s/%s: %s: %s",
+                settings.DB_HOST, settings.DB_PORT, settings.DB_DATABASE, type(e).__name__, e
+            )
+            db_connected = False
 
-@app.post("/api/process-barcode", response_model=ApprovalResponse)
-async def process_barcode(request: BarcodeRequest):
+        _health_cache['ts'] = now
+        _health_cache['ok'] = db_connected
+
+    db_connected = _health_cache['ok']
+    return HealthResponse(
+        status="ok" if db_connected else "error",
+        database_connected=db_connected,
+        api_version=app.version
+    )
+
+
+# Тело запроса разбирается вручную (orjson) - схема BarcodeRequest остается в OpenAPI
+@app.post(
+    "/api/process-barcode",
+    response_model=ApprovalResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": BarcodeRequest.model_json_schema()}},
+        }
+    },
+)
+async def process_barcode(request: Request):
     """
     Обработка штрихкода и приходование изделия
 
@@ -1267,59 +1218,47 @@ async def process_barcode(request: BarcodeRequest):
     - 123456789 (9 цифр): обрабатывается как D-123456789
     - 12345 (не 9 цифр): обрабатывается как ORD-12345
     """
-    try:
-        barcode = request.barcode.strip()
+    payload = _read_json_body(await request.body())
+    barcode = payload.get('barcode') if isinstance(payload, dict) else None
+    if not _is_barcode(barcode):
+        return _bad_request("Ожидается поле barcode: строка из символов ASCII")
 
-        # Парсим штрихкод и определяем тип
-        barcode_info = parse_barcode(barcode)
-        barcode_type = barcode_info['type']
-        barcode_value = barcode_info['value']
+    # Словарь ответа сериализуется orjson напрямую, минуя валидацию ответа FastAPI
+    return ORJSONResponse(content=await run_in_threadpool(_handle_barcode, barcode))
 
-        print(f"[INFO] Обработка штрихкода: type={barcode_type}, value={barcode_value}")
-
-        # Маршрутизация по типу штрихкода
-        if barcode_type == 'IZD' or barcode_type == 'LEGACY_IZD':
-            return await process_izd_barcode(barcode_value)
 
-        elif barcode_type == 'ORD' or barcode_type == 'LEGACY_ORD':
-            return await process_order_barcode(barcode_value)
+# Максимум штрихкодов в одном пакетном запросе
+BARCODE_BATCH_MAX = 64
 
-        elif barcode_type == 'ITM':
-            return await process_itm_barcode(barcode_value)
 
-        elif barcode_type == 'SET':
-            return await process_set_barcode(barcode_value)
+@app.post(
+    "/api/process-barcodes",
+    response_model=BarcodeBatchResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": BarcodeBatchRequest.model_json_schema()}},
+        }
+    },
+)
+async def process_barcodes(request: Request):
+    """
+    Пакетная обработка штрихкодов (клиент объединяет сканирования, пришедшие подряд)
 
-        else:  # UNKNOWN
-            return ApprovalResponse(
-                success=False,
-                message=f"Неизвестный формат штрихкода: {barcode}",
-                voice_message="Ошибка. Неизвестный формат штрихкода",
-                product_info=None
-            )
-        
-    except ValueError as e:
-        return ApprovalResponse(
-            success=False,
-            message=f"Ошибка обработки штрихкода: {str(e)}",
-            voice_message="Ошибка обработки штрихкода",
-            product_info=None
-        )
-    except fdb.DatabaseError as e:
-        return ApprovalResponse(
-            success=False,
-            message=f"Ошибка базы данных: {str(e)}",
-            voice_message="Ошибка базы данных",
-            product_info=None
-        )
-    except Exception as e:
-        return ApprovalResponse(
-            success=False,
-            message=f"Неизвестная ошибка: {str(e)}",
-            voice_message="Неизвестная ошибка",
-            product_info=None
+    Штрихкоды обрабатываются по порядку так же, как в /api/process-barcode;
+    results[i] - ответ для barcodes[i].
+    """
+    payload = _read_json_body(await request.body())
+    barcodes = payload.get('barcodes') if isinstance(payload, dict) else None
+    if (not isinstance(barcodes, list) or len(barcodes) > BARCODE_BATCH_MAX
+            or not all(_is_barcode(barcode) for barcode in barcodes)):
+        return _bad_request(
+            f"Ожидается поле barcodes: список строк из символов ASCII (не более {BARCODE_BATCH_MAX})"
         )
 
+    results = await run_in_threadpool(_handle_barcode_batch, barcodes)
+    return ORJSONResponse(content={"results": results})
+
 
 @app.get("/api/statistics/daily", response_model=DailyStatsResponse)
 async def get_daily_statistics(
@@ -1360,89 +1299,20 @@ async def get_daily_statistics(
                 data=[]
             )
 
-        # Объединенный SQL запрос
-        query = """
-            SELECT
-                o.proddate,
-                o.orderno,
-                o.rcomment,
-                SUM(CASE
-                    WHEN rs.systemtype = 0 AND rs.rsystemid <> 8 AND rs.rsystemid <> 27
-                    THEN 1 ELSE 0
-                END) AS planned_pvh,
-                SUM(CASE
-                    WHEN (rs.systemtype = 1) OR (rs.rsystemid = 8)
-                    THEN 1 ELSE 0
-                END) AS planned_razdv,
-                SUM(CASE
-                    WHEN rs.rsystemid = 28
-                    THEN 1 ELSE 0
-                END) AS planned_glass,
-                SUM(CASE
-                    WHEN rs.systemtype = 0 AND rs.rsystemid <> 8 AND rs.rsystemid <> 27 AND wd.isapproved = 1
-                    THEN 1 ELSE 0
-                END) AS completed_pvh,
-                SUM(CASE
-                    WHEN ((rs.systemtype = 1) OR (rs.rsystemid = 8)) AND wd.isapproved = 1
-                    THEN 1 ELSE 0
-                END) AS completed_razdv,
-                SUM(CASE
-                    WHEN rs.rsystemid = 28 AND wd.isapproved = 1
-                    THEN 1 ELSE 0
-                END) AS completed_glass
-            FROM orders o
-            JOIN orderitems oi ON oi.orderid = o.orderid
-            JOIN models m ON m.orderitemsid = oi.orderitemsid
-            JOIN r_systems rs ON rs.rsystemid = m.sysprofid
-            LEFT JOIN ct_elements el ON el.modelid = m.modelid AND el.cttypeelemsid = 2
-            LEFT JOIN ct_whdetail wd ON wd.ctelementsid = el.ctelementsid
-            WHERE o.proddate BETWEEN ? AND ?
-            GROUP BY o.proddate, o.orderno, o.rcomment
-            ORDER BY o.proddate, o.orderno
-        """
-
-        results = db.execute_query(query, (start_date, end_date))
-
-        # Агрегация по датам
-        daily_dict = {}
-        for row in results:
-            proddate = row['PRODDATE']
-            if isinstance(proddate, datetime):
-                proddate = proddate.date().strftime('%Y-%m-%d')
-            elif hasattr(proddate, 'strftime'):
-                proddate = proddate.strftime('%Y-%m-%d')
-            else:
-                proddate = str(proddate)
-
-            if proddate not in daily_dict:
-                daily_dict[proddate] = {
-                    'planned_pvh': 0,
-                    'planned_razdv': 0,
-                    'planned_glass': 0,
-                    'completed_pvh': 0,
-                    'completed_razdv': 0,
-                    'completed_glass': 0
-                }
-
-            daily_dict[proddate]['planned_pvh'] += row.get('PLANNED_PVH', 0) or 0
-            daily_dict[proddate]['planned_razdv'] += row.get('PLANNED_RAZDV', 0) or 0
-            daily_dict[proddate]['planned_glass'] += row.get('PLANNED_GLASS', 0) or 0
-            daily_dict[proddate]['completed_pvh'] += row.get('COMPLETED_PVH', 0) or 0
-            daily_dict[proddate]['completed_razdv'] += row.get('COMPLETED_RAZDV', 0) or 0
-            daily_dict[proddate]['completed_glass'] += row.get('COMPLETED_GLASS', 0) or 0
-
-        # Преобразование в список
+        # fdb синхронный - запрос выполняется в пуле потоков, не блокируя event loop
+        results = await run_in_threadpool(db.execute_query, SQL_STATS_BY_DAY, (start_date, end_date))
+
         daily_stats = [
             DailyStatsRow(
-                proddate=date,
-                planned_pvh=stats['planned_pvh'],
-                planned_razdv=stats['planned_razdv'],
-                planned_glass=stats['planned_glass'],
-                completed_pvh=stats['completed_pvh'],
-                completed_razdv=stats['completed_razdv'],
-                completed_glass=stats['completed_glass']
+                proddate=row['PRODDATE'],
+                planned_pvh=row['PLANNED_PVH'] or 0,
+                planned_razdv=row['PLANNED_RAZDV'] or 0,
+                planned_glass=row['PLANNED_GLASS'] or 0,
+                completed_pvh=row['COMPLETED_PVH'] or 0,
+                completed_razdv=row['COMPLETED_RAZDV'] or 0,
+                completed_glass=row['COMPLETED_GLASS'] or 0
             )
-            for date, stats in sorted(daily_dict.items())
+            for row in results
         ]
 
         return DailyStatsResponse(
@@ -1504,72 +1374,27 @@ async def get_order_statistics(
                 data=[]
             )
 
-        # Объединенный SQL запрос (тот же что и для daily)
-        query = """
-            SELECT
-                o.proddate,
-                o.orderno,
-                o.rcomment,
-                SUM(CASE
-                    WHEN rs.systemtype = 0 AND rs.rsystemid <> 8 AND rs.rsystemid <> 27
-                    THEN 1 ELSE 0
-                END) AS planned_pvh,
-                SUM(CASE
-                    WHEN (rs.systemtype = 1) OR (rs.rsystemid = 8)
-                    THEN 1 ELSE 0
-                END) AS planned_razdv,
-                SUM(CASE
-                    WHEN rs.rsystemid = 28
-                    THEN 1 ELSE 0
-                END) AS planned_glass,
-                SUM(CASE
-                    WHEN rs.systemtype = 0 AND rs.rsystemid <> 8 AND rs.rsystemid <> 27 AND wd.isapproved = 1
-                    THEN 1 ELSE 0
-                END) AS completed_pvh,
-                SUM(CASE
-                    WHEN ((rs.systemtype = 1) OR (rs.rsystemid = 8)) AND wd.isapproved = 1
-                    THEN 1 ELSE 0
-                END) AS completed_razdv,
-                SUM(CASE
-                    WHEN rs.rsystemid = 28 AND wd.isapproved = 1
-                    THEN 1 ELSE 0
-                END) AS completed_glass
-            FROM orders o
-            JOIN orderitems oi ON oi.orderid = o.orderid
-            JOIN models m ON m.orderitemsid = oi.orderitemsid
-            JOIN r_systems rs ON rs.rsystemid = m.sysprofid
-            LEFT JOIN ct_elements el ON el.modelid = m.modelid AND el.cttypeelemsid = 2
-            LEFT JOIN ct_whdetail wd ON wd.ctelementsid = el.ctelementsid
-            WHERE o.proddate BETWEEN ? AND ?
-            GROUP BY o.proddate, o.orderno, o.rcomment
-            ORDER BY o.proddate, o.orderno
-        """
-
-        results = db.execute_query(query, (start_date, end_date))
+        # fdb синхронный - запрос выполняется в пуле потоков, не блокируя event loop
+        results = await run_in_threadpool(db.execute_query, SQL_STATS_BY_ORDER, (start_date, end_date))
 
         # Преобразование результатов
         order_stats = []
         for row in results:
             proddate = row['PRODDATE']
-            if isinstance(proddate, datetime):
-                proddate = proddate.date().strftime('%Y-%m-%d')
-            elif hasattr(proddate, 'strftime'):
-                proddate = proddate.strftime('%Y-%m-%d')
-            else:
-                proddate = str(proddate)
 
-            orderno = row['ORDERNO'].strip() if row['ORDERNO'] else ""
-            rcomment = row['RCOMMENT'].strip() if row['RCOMMENT'] else None
+            # ORDERNO и RCOMMENT уже обрезаны в запросе (TRIM)
+            orderno = row['ORDERNO'] or ""
+            rcomment = row['RCOMMENT'] or None
 
             order_stats.append(OrderStatsRow(
                 order_number=orderno,
                 proddate=proddate,
-                planned_pvh=row.get('PLANNED_PVH', 0) or 0,
-                planned_razdv=row.get('PLANNED_RAZDV', 0) or 0,
-                planned_glass=row.get('PLANNED_GLASS', 0) or 0,
-                completed_pvh=row.get('COMPLETED_PVH', 0) or 0,
-                completed_razdv=row.get('COMPLETED_RAZDV', 0) or 0,
-                completed_glass=row.get('COMPLETED_GLASS', 0) or 0,
+                planned_pvh=row['PLANNED_PVH'] or 0,
+                planned_razdv=row['PLANNED_RAZDV'] or 0,
+                planned_glass=row['PLANNED_GLASS'] or 0,
+                completed_pvh=row['COMPLETED_PVH'] or 0,
+                completed_razdv=row['COMPLETED_RAZDV'] or 0,
+                completed_glass=row['COMPLETED_GLASS'] or 0,
                 comment=rcomment
             ))
 
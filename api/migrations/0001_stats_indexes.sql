@@ -0,0 +1,26 @@
+/*
+  Индексы для отчетов статистики (/api/statistics/daily, /api/statistics/orders).
+
+  Запрос статистики ведется от ORDERS по диапазону PRODDATE и далее по
+  ORDERITEMS -> MODELS -> CT_ELEMENTS (CTTYPEELEMSID = 2) -> CT_WHDETAIL.
+  Индексы покрывают условие фильтра и соединения элементов и склада.
+
+  Выполнять один раз через isql под владельцем БД:
+    isql -user SYSDBA -password ... host/3050:C:\path\to\base.fdb -i 0001_stats_indexes.sql
+
+  Если индекс с таким именем (или на тех же полях) уже есть - соответствующую
+  строку CREATE INDEX нужно пропустить.
+*/
+
+CREATE INDEX IDX_ORDERS_PRODDATE ON ORDERS (PRODDATE);
+CREATE INDEX IDX_CT_ELEMENTS_MODEL_TYPE ON CT_ELEMENTS (MODELID, CTTYPEELEMSID);
+CREATE INDEX IDX_CT_WHDETAIL_ELEM_APPR ON CT_WHDETAIL (CTELEMENTSID, ISAPPROVED);
+
+COMMIT;
+
+/* Пересчет селективности, чтобы оптимизатор сразу начал использовать индексы */
+SET STATISTICS INDEX IDX_ORDERS_PRODDATE;
+SET STATISTICS INDEX IDX_CT_ELEMENTS_MODEL_TYPE;
+SET STATISTICS INDEX IDX_CT_WHDETAIL_ELEM_APPR;
+
+COMMIT;
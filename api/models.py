@@ -2,7 +2,7 @@
 Pydantic модели для API
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 
@@ -39,6 +39,11 @@ class ProductInfo(BaseModel):
 class ApprovalResponse(BaseModel):
     """Ответ на запрос приходования"""
     success: bool = Field(..., description="Успешность операции")
+    status: Literal["ok", "duplicate", "already_shipped", "not_ready", "error"] = Field(
+        "error",
+        description="Код результата: ok - успешно, duplicate - уже отмечено готовым, "
+                    "already_shipped - заказ уже отгружен, not_ready - заказ еще не готов, error - ошибка"
+    )
     message: str = Field(..., description="Сообщение для пользователя")
     voice_message: str = Field(..., description="Текст для озвучивания")
     product_info: Optional[ProductInfo] = Field(None, description="Информация об изделии")
@@ -47,6 +52,7 @@ class ApprovalResponse(BaseModel):
         json_schema_extra = {
             "example": {
                 "success": True,
+                "status": "ok",
                 "message": "Изделие успешно приходовано",
                 "voice_message": "Изделие номер 1 конструкции 01 заказа 19686 готово",
                 "product_info": {
@@ -65,6 +71,23 @@ class ApprovalResponse(BaseModel):
         }
 
 
+class BarcodeBatchRequest(BaseModel):
+    """Запрос на пакетную обработку штрихкодов"""
+    barcodes: list[str] = Field(..., description="Штрихкоды в порядке сканирования")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "barcodes": ["D-011234567", "ORD-12345"]
+            }
+        }
+
+
+class BarcodeBatchResponse(BaseModel):
+    """Ответ на пакетную обработку: results[i] соответствует barcodes[i]"""
+    results: list[ApprovalResponse] = Field(default_factory=list, description="Результаты по каждому штрихкоду")
+
+
 class HealthResponse(BaseModel):
     """Ответ на проверку здоровья сервиса"""
     status: str = Field(..., description="Статус сервиса")
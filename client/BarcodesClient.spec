@@ -9,6 +9,7 @@ a = Analysis(
     ],
     datas=[
         ('sounds/*.mp3', 'sounds'),
+        ('icon.ico', '.'),
     ],
     hiddenimports=[
         'PyQt5',
@@ -16,12 +17,9 @@ a = Analysis(
         'PyQt5.QtGui',
         'PyQt5.QtWidgets',
         'requests',
+        'orjson',
         'pygame',
         'pygame.mixer',
-        'PIL',
-        'PIL.Image',
-        'PIL.ImageDraw',
-        'PIL.ImageFont',
         'config',
     ],
     hookspath=[],
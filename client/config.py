@@ -5,14 +5,22 @@
 # API Configuration
 API_BASE_URL = "http://localhost:8015"
 API_PROCESS_BARCODE_ENDPOINT = "/api/process-barcode"
+API_PROCESS_BARCODES_ENDPOINT = "/api/process-barcodes"  # Пакетная обработка
 API_HEALTH_ENDPOINT = "/"
 API_DAILY_STATS_ENDPOINT = "/api/statistics/daily"
 API_ORDER_STATS_ENDPOINT = "/api/statistics/orders"
+HEALTH_CHECK_INTERVAL_MS = 30 * 1000  # Период повторной проверки подключения к API
+HEALTH_CHECK_RETRY_MIN_MS = 1000  # Первая повторная проверка после потери связи (далее интервал удваивается)
+STATS_CACHE_TTL_SECONDS = 5 * 60  # Кеш статистики моложе этого не загружается заново при старте
 
 # UI Configuration
 WINDOW_TITLE = "Система учета готовности изделий"
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 800
+HISTORY_MAX_ROWS = 100  # Максимум строк в истории сканирований
+DUPLICATE_SCAN_INTERVAL = 0.3  # Повтор того же штрихкода за это время (сек) игнорируется
+BARCODE_BATCH_WINDOW_MS = 50  # Сканирования в пределах этого окна отправляются одним запросом
+BARCODE_BATCH_MAX = 16  # Максимум штрихкодов в одном пакетном запросе
 
 # TTS Configuration (Google TTS)
 # Google TTS автоматически определяет оптимальную скорость и качество голоса
@@ -3,23 +3,65 @@
 """
 import sys
 import os
+import re
+import orjson
 import requests
-import threading
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import logging
+import logging.handlers
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import pygame
+from functools import lru_cache
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
+    QLabel, QLineEdit, QPushButton, QTableView,
     QGroupBox, QHeaderView, QTabWidget, QMessageBox, QSplitter
 )
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject
-from PyQt5.QtGui import QFont, QColor, QIcon, QPixmap, QImage
-from PIL import Image, ImageDraw, ImageFont
+from PyQt5.QtCore import (
+    Qt, QTimer, pyqtSignal, QObject, QRunnable, QThreadPool,
+    QAbstractTableModel, QModelIndex
+)
+from PyQt5.QtGui import QFont, QFontMetrics, QColor, QBrush, QIcon
 import ctypes
 
 import config
 
 
+logger = logging.getLogger("barcodes.client")
+
+
+# Общая HTTP-сессия: соединения с API переиспользуются (keep-alive) между сканированиями.
+# Повторы запросов отключены - ошибку сразу видит оператор, а не ждет скрытых повторов
+SESSION = requests.Session()
+_HTTP_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=0))
+SESSION.mount('http://', _HTTP_ADAPTER)
+SESSION.mount('https://', _HTTP_ADAPTER)
+SESSION.headers['Accept'] = 'application/json'
+
+# Отдельная сессия для фоновой загрузки статистики: GET-запросы безопасно повторить
+# при недоступности API (502/503/504 или обрыв соединения) - оператор этого не ждет
+STATS_SESSION = requests.Session()
+_STATS_ADAPTER = HTTPAdapter(
+    pool_connections=2, pool_maxsize=2,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=['GET'])
+)
+STATS_SESSION.mount('http://', _STATS_ADAPTER)
+STATS_SESSION.mount('https://', _STATS_ADAPTER)
+STATS_SESSION.headers['Accept'] = 'application/json'
+
+# Адреса API собираются один раз при запуске
+PROCESS_BARCODE_URL = f"{config.API_BASE_URL}{config.API_PROCESS_BARCODE_ENDPOINT}"
+PROCESS_BARCODES_URL = f"{config.API_BASE_URL}{config.API_PROCESS_BARCODES_ENDPOINT}"
+HEALTH_URL = f"{config.API_BASE_URL}{config.API_HEALTH_ENDPOINT}"
+DAILY_STATS_URL = f"{config.API_BASE_URL}{config.API_DAILY_STATS_ENDPOINT}"
+ORDER_STATS_URL = f"{config.API_BASE_URL}{config.API_ORDER_STATS_ENDPOINT}"
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
 def set_windows_appid():
     """Устанавливает AppUserModelID для Windows для правильного отображения иконки в панели задач"""
     try:
@@ -27,110 +69,112 @@ def set_windows_appid():
         app_id = 'VKCompany.BarcodeApp.ProductTracking.1.0'
         ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
     except Exception as e:
-        print(f"Не удалось установить AppUserModelID: {e}")
+        logger.warning("Не удалось установить AppUserModelID: %s", e)
 
 
-def create_emoji_icon():
-    """Создает иконку с emoji для приложения"""
-    try:
-        # Создаем изображение с emoji
-        size = 256
-        image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(image)
-        
-        # Пытаемся использовать системный шрифт с поддержкой emoji
-        try:
-            # Для Windows используем Segoe UI Emoji
-            font = ImageFont.truetype("seguiemj.ttf", size - 40)
-        except (OSError, IOError):
-            try:
-                # Альтернативный шрифт для Windows
-                font = ImageFont.truetype("arial.ttf", size - 40)
-            except (OSError, IOError):
-                # Если не найден, используем стандартный
-                font = ImageFont.load_default()
-        
-        # Рисуем emoji в центре
-        emoji = "📦"
-        
-        # Получаем размер текста для центрирования
-        bbox = draw.textbbox((0, 0), emoji, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        position = ((size - text_width) // 2 - bbox[0], 
-                   (size - text_height) // 2 - bbox[1])
-        
-        draw.text(position, emoji, font=font, embedded_color=True)
-        
-        # Конвертируем в QPixmap
-        image_bytes = image.tobytes("raw", "RGBA")
-        qimage = QImage(image_bytes, size, size, QImage.Format_RGBA8888)
-        pixmap = QPixmap.fromImage(qimage)
-        
-        return QIcon(pixmap)
-    except Exception as e:
-        print(f"Ошибка создания иконки: {e}")
-        return None
+# Допустимый штрихкод: цифры с необязательным префиксом (те же форматы, что разбирает API)
+BARCODE_RE = re.compile(r"^(?:(?:D|B|ORD|R|T|S|IZD|ITM|SET)\s*-\s*)?\d+$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
+def make_font(point_size, bold=False, italic=False):
+    """Шрифт заданного размера и начертания (создается один раз и переиспользуется)"""
+    font = QFont()
+    font.setPointSize(point_size)
+    font.setBold(bold)
+    font.setItalic(italic)
+    return font
+
+
+def resource_path(relative_path):
+    """Путь к файлу ресурсов (рядом со скриптом или внутри сборки PyInstaller)"""
+    if getattr(sys, 'frozen', False):
+        # Если приложение скомпилировано
+        base_path = sys._MEIPASS
+    else:
+        # Если запускается как скрипт
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, relative_path)
 
 
 class SoundPlayer(QObject):
     """Класс для воспроизведения звуковых уведомлений"""
 
+    # Инициализация звука (в фоновом потоке) завершена
+    ready = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.audio_available = False
         self.sounds = {}
-        self.init_engine()
+        # Закрепленный канал микшера для каждого звука
+        self.channels = {}
+        # Пока звук не инициализирован, запоминаем последний запрошенный звук
+        self.is_ready = False
+        self.pending_sound = None
+        self.ready.connect(self.on_ready)
+
+    def start(self):
+        """Запустить инициализацию звука в пуле потоков (не задерживает показ окна)"""
+        QThreadPool.globalInstance().start(self.init_engine)
+
+    def on_ready(self):
+        """Звук инициализирован (главный поток) - проигрываем отложенный звук"""
+        self.is_ready = True
+        if self.pending_sound:
+            sound_type, self.pending_sound = self.pending_sound, None
+            self.play_sound(sound_type)
 
     def init_engine(self):
-        """Инициализация pygame mixer и загрузка звуков"""
+        """Инициализация pygame mixer и загрузка звуков (выполняется в пуле потоков)"""
         try:
+            # pygame импортируется только при инициализации звука, а не при старте модуля
+            # (без pygame приложение работает, просто без звука)
+            import pygame
+
             # Пытаемся инициализировать pygame mixer с разными настройками
             try:
-                # Стандартная инициализация
+                # Стандартная инициализация (маленький буфер - меньше задержка перед звуком)
+                pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=512)
                 pygame.mixer.init()
-                print("Pygame mixer инициализирован успешно (стандартный режим)")
+                logger.info("Pygame mixer инициализирован успешно (стандартный режим)")
                 self.audio_available = True
             except Exception as e:
-                print(f"Ошибка стандартной инициализации pygame mixer: {e}")
+                logger.warning("Ошибка стандартной инициализации pygame mixer: %s", e)
                 try:
                     # Пробуем с явными параметрами (низкая частота)
                     pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-                    print("Pygame mixer инициализирован успешно (режим 22050Hz)")
+                    logger.info("Pygame mixer инициализирован успешно (режим 22050Hz)")
                     self.audio_available = True
                 except Exception as e2:
-                    print(f"Ошибка инициализации с параметрами 22050Hz: {e2}")
+                    logger.warning("Ошибка инициализации с параметрами 22050Hz: %s", e2)
                     try:
                         # Пробуем с минимальными параметрами (моно)
                         pygame.mixer.init(frequency=44100, size=-16, channels=1, buffer=4096)
-                        print("Pygame mixer инициализирован успешно (режим 44100Hz mono)")
+                        logger.info("Pygame mixer инициализирован успешно (режим 44100Hz mono)")
                         self.audio_available = True
                     except Exception as e3:
-                        print(f"Не удалось инициализировать pygame mixer: {e3}")
-                        print("Звуковые уведомления будут отключены")
+                        logger.error("Не удалось инициализировать pygame mixer: %s", e3)
+                        logger.warning("Звуковые уведомления будут отключены")
                         self.audio_available = False
 
             # Загружаем звуковые файлы
             if self.audio_available:
                 self.load_sounds()
+                self.warm_up()
 
         except Exception as e:
-            print(f"Критическая ошибка инициализации звука: {e}")
+            logger.error("Критическая ошибка инициализации звука: %s", e)
             self.audio_available = False
+        finally:
+            self.ready.emit()
 
     def load_sounds(self):
         """Загрузка звуковых файлов"""
         try:
-            # Определяем путь к папке sounds
-            if getattr(sys, 'frozen', False):
-                # Если приложение скомпилировано
-                base_path = sys._MEIPASS
-            else:
-                # Если запускается как скрипт
-                base_path = os.path.dirname(os.path.abspath(__file__))
+            import pygame
 
-            sounds_dir = os.path.join(base_path, 'sounds')
+            sounds_dir = resource_path('sounds')
 
             # Загружаем звуки
             sound_files = {
@@ -143,56 +187,415 @@ class SoundPlayer(QObject):
                 sound_path = os.path.join(sounds_dir, filename)
                 if os.path.exists(sound_path):
                     self.sounds[sound_name] = pygame.mixer.Sound(sound_path)
-                    print(f"Загружен звук: {sound_name} ({filename})")
+                    logger.info("Загружен звук: %s (%s)", sound_name, filename)
                 else:
-                    print(f"Звуковой файл не найден: {sound_path}")
+                    logger.warning("Звуковой файл не найден: %s", sound_path)
 
             if not self.sounds:
-                print("Не удалось загрузить ни одного звукового файла")
+                logger.warning("Не удалось загрузить ни одного звукового файла")
                 self.audio_available = False
+                return
+
+            # Каждому звуку - свой зарезервированный канал: воспроизведение не ищет свободный канал,
+            # а повтор того же звука перезапускает его, а не накладывается
+            pygame.mixer.set_reserved(len(self.sounds))
+            self.channels = {name: pygame.mixer.Channel(i) for i, name in enumerate(self.sounds)}
 
         except Exception as e:
-            print(f"Ошибка загрузки звуков: {e}")
+            logger.error("Ошибка загрузки звуков: %s", e)
             self.audio_available = False
 
+    def warm_up(self):
+        """Прогрев аудиоустройства: короткий беззвучный буфер открывает устройство заранее,
+        чтобы первый звук при сканировании не ждал его инициализации"""
+        try:
+            import pygame
+
+            pygame.mixer.Sound(buffer=bytes(64)).play()
+        except Exception as e:
+            logger.warning("Не удалось прогреть аудиоустройство: %s", e)
+
     def play_sound(self, sound_type):
         """Воспроизвести звук определенного типа
 
         Args:
             sound_type: 'success', 'already_approved', или 'error'
         """
+        if not self.is_ready:
+            self.pending_sound = sound_type
+            return
+
         # Проверяем доступность аудио
         if not self.audio_available:
-            print(f"Аудио недоступно, пропускаем воспроизведение: {sound_type}")
+            logger.debug("Аудио недоступно, пропускаем воспроизведение: %s", sound_type)
             return
 
         try:
             if sound_type in self.sounds:
-                self.sounds[sound_type].play()
+                self.channels[sound_type].play(self.sounds[sound_type])
             else:
-                print(f"Звук '{sound_type}' не найден")
+                logger.warning("Звук '%s' не найден", sound_type)
         except Exception as e:
-            print(f"Ошибка воспроизведения звука: {e}")
+            logger.error("Ошибка воспроизведения звука: %s", e)
             # При ошибке отключаем аудио, чтобы не пытаться повторять
             self.audio_available = False
 
 
+# Цвета статусов (общие экземпляры, не создаются на каждую строку)
+COLOR_OK = QColor(0, 200, 0)  # Зеленый
+COLOR_WARNING = QColor(255, 165, 0)  # Оранжевый
+COLOR_ERROR = QColor(255, 0, 0)  # Красный
+# Кисти для ячеек таблиц статистики (setForeground иначе строит QBrush из цвета на каждую ячейку)
+BRUSH_OK = QBrush(COLOR_OK)
+BRUSH_WARNING = QBrush(COLOR_WARNING)
+
+
+# Отображение кода результата API: текст статуса, цвет, счетчик статистики, звук
+STATUS_VIEWS = {
+    'ok': ("✅ Успех", COLOR_OK, 'success', 'success'),
+    'duplicate': ("⚠️ Уже оприходовано", COLOR_WARNING, 'already_approved', 'already_approved'),
+    'already_shipped': ("⚠️ Уже отгружен", COLOR_WARNING, 'already_approved', 'already_approved'),
+    'not_ready': ("⏳ Еще не готов", COLOR_ERROR, 'failed', 'error'),
+    'error': ("❌ Ошибка", COLOR_ERROR, 'failed', 'error'),
+}
+
+# Строка статистики сканирований за сегодня
+STATS_TEXT_TEMPLATE = "Всего: %d | ✅ Успешно: %d | ⚠️ Уже оприходовано: %d | ❌ Ошибок: %d"
+
+
+# Типичное (самое широкое) содержимое колонок истории - по нему задается ширина колонок
+HISTORY_COLUMN_SAMPLES = [
+    "⚠️ Уже оприходовано", "ORD-0000000", "000000", "0000-00-00", "00", "00 / 00", "0000 x 0000", "000", "000", "00:00:00"
+]
+
+
+# Файл с последней загруженной статистикой (кеш между запусками)
+STATS_CACHE_PATH = os.path.join(tempfile.gettempdir(), "barcodes_stats_cache.json")
+# Журнал клиента (предупреждения и ошибки)
+LOG_FILE_PATH = os.path.join(tempfile.gettempdir(), "barcodes_client.log")
+# Файл со счетчиками и историей сканирований за сегодня (восстанавливаются после перезапуска)
+SESSION_STATE_PATH = os.path.join(tempfile.gettempdir(), "barcodes_session_state.json")
+
+# Потоки загрузки статистики: в одном загружается отчет по дням (и ожидается второй),
+# в другом параллельно - отчет по заказам. Загрузка одна в каждый момент (stats_loading)
+STATS_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="stats")
+# Потоки отправки сканирований - отдельно от общего пула Qt, где проверка API и
+# инициализация звука могут надолго занимать потоки
+SCAN_THREADS = 2
+
+
+def fetch_stats(url, params):
+    """Загрузить строки отчета статистики (None, если API вернул ошибку)"""
+    response = STATS_SESSION.get(url, params=params, timeout=10)
+    if response.status_code != 200:
+        return None
+    data = orjson.loads(response.content)
+    return data.get('data', []) if data.get('success') else None
+
+
+@lru_cache(maxsize=64)
+def format_proddate(proddate):
+    """Дата из API (YYYY-MM-DD) в виде день.месяц.год; иное значение возвращается как есть"""
+    if isinstance(proddate, str) and len(proddate) == 10 and proddate[4] == '-' and proddate[7] == '-':
+        return f"{proddate[8:]}.{proddate[5:7]}.{proddate[:4]}"
+    return proddate
+
+
+def completion_brush(completed, planned):
+    """Цвет ячейки "Сделано": зеленый - план выполнен, оранжевый - начат, без цвета - не начат"""
+    if planned > 0:
+        if completed >= planned:
+            return BRUSH_OK
+        if completed > 0:
+            return BRUSH_WARNING
+    return None
+
+
+def daily_stats_row(row_data):
+    """Строка таблицы статистики по дням: (тексты ячеек, кисти ячеек)"""
+    planned_pvh = row_data['planned_pvh']
+    completed_pvh = row_data['completed_pvh']
+    planned_razdv = row_data['planned_razdv']
+    completed_razdv = row_data['completed_razdv']
+    planned_glass = row_data.get('planned_glass', 0)
+    completed_glass = row_data.get('completed_glass', 0)
+    # Итого - сумма ПВХ, Раздвижки и Стеклопакетов
+    total_planned = planned_pvh + planned_razdv + planned_glass
+    total_completed = completed_pvh + completed_razdv + completed_glass
+
+    # Дата (день.месяц.год), затем пары План/Сделано с цветовой индикацией
+    texts = (
+        format_proddate(row_data['proddate']),
+        str(planned_pvh), str(completed_pvh),
+        str(planned_razdv), str(completed_razdv),
+        str(planned_glass), str(completed_glass),
+        str(total_planned), str(total_completed),
+    )
+    brushes = (
+        None,
+        None, completion_brush(completed_pvh, planned_pvh),
+        None, completion_brush(completed_razdv, planned_razdv),
+        None, completion_brush(completed_glass, planned_glass),
+        None, completion_brush(total_completed, total_planned),
+    )
+    return texts, brushes
+
+
+def order_stats_row(row_data):
+    """Строка таблицы статистики по заказам: (тексты ячеек, кисти ячеек)"""
+    planned_pvh = row_data['planned_pvh']
+    completed_pvh = row_data['completed_pvh']
+    planned_razdv = row_data['planned_razdv']
+    completed_razdv = row_data['completed_razdv']
+    planned_glass = row_data.get('planned_glass', 0)
+    completed_glass = row_data.get('completed_glass', 0)
+    comment = row_data.get('comment', '') or ''
+
+    # Заказ, дата производства (день.месяц.год), пары План/Сделано, комментарий
+    texts = (
+        str(row_data['order_number']),
+        format_proddate(row_data['proddate']),
+        str(planned_pvh), str(completed_pvh),
+        str(planned_razdv), str(completed_razdv),
+        str(planned_glass), str(completed_glass),
+        comment.strip(),
+    )
+    brushes = (
+        None, None,
+        None, completion_brush(completed_pvh, planned_pvh),
+        None, completion_brush(completed_razdv, planned_razdv),
+        None, completion_brush(completed_glass, planned_glass),
+        None,
+    )
+    return texts, brushes
+
+
+def stats_date_range():
+    """Период статистики: 2 дня назад - 5 дней вперёд (YYYY-MM-DD)"""
+    today = datetime.now()
+    start_date = (today - timedelta(days=2)).strftime('%Y-%m-%d')
+    end_date = (today + timedelta(days=5)).strftime('%Y-%m-%d')
+    return start_date, end_date
+
+
+def read_json_file(path):
+    """Прочитать JSON-файл состояния (None, если файла нет или он поврежден)"""
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Файл %s не прочитан: %s", path, e)
+        return None
+
+
+def write_json_file(path, data):
+    """Записать JSON-файл состояния (ошибка записи только логируется)"""
+    try:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data))
+    except OSError as e:
+        logger.warning("Не удалось сохранить %s: %s", path, e)
+
+
+def load_stats_cache(start_date, end_date):
+    """Последняя загруженная статистика с диска: (время загрузки, по дням, по заказам) или None"""
+    cached = read_json_file(STATS_CACHE_PATH)
+    try:
+        if cached['start_date'] != start_date or cached['end_date'] != end_date:
+            return None
+        return cached['saved_at'], cached['daily'], cached['orders']
+    except (TypeError, KeyError):
+        return None
+
+
+def save_stats_cache(start_date, end_date, daily_data, order_data):
+    """Сохранить загруженную статистику на диск (показывается сразу при следующем запуске)"""
+    write_json_file(STATS_CACHE_PATH, {
+        'start_date': start_date,
+        'end_date': end_date,
+        'saved_at': time.time(),
+        'daily': daily_data,
+        'orders': order_data,
+    })
+
+
+class StatsTableModel(QAbstractTableModel):
+    """Модель таблицы статистики: строки хранятся готовыми кортежами (тексты, кисти)"""
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.rows[index.row()][0][index.column()]
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.ForegroundRole:
+            return self.rows[index.row()][1][index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def set_rows(self, rows):
+        """Заменить все строки таблицы"""
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+
+class HistoryModel(QAbstractTableModel):
+    """Модель истории сканирований: новые записи сверху, не больше max_rows строк
+
+    Строка - кортеж (цвет статуса, тексты ячеек по колонкам)
+    """
+
+    HEADERS = [
+        "Статус", "Штрихкод", "Заказ", "Дата произв.", "Изделие", "Номер №", "Размеры", "Кол-во в заказе", "Кол-во готово", "Время"
+    ]
+
+    def __init__(self, max_rows, parent=None):
+        super().__init__(parent)
+        self.rows = deque(maxlen=max_rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        status_color, texts = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            return texts[column]
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if column == 0:
+            if role == Qt.ForegroundRole:
+                return status_color
+            if role == Qt.FontRole:
+                return make_font(19, bold=True)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def snapshot(self):
+        """Записи для сохранения на диск: [цвет статуса (#rrggbb), тексты ячеек]"""
+        return [[status_color.name(), list(texts)] for status_color, texts in self.rows]
+
+    def restore(self, rows):
+        """Заменить записи сохраненными ранее (snapshot)"""
+        self.beginResetModel()
+        self.rows.clear()
+        self.rows.extend((QColor(color_name), tuple(texts)) for color_name, texts in rows[:self.rows.maxlen])
+        self.endResetModel()
+
+    def prepend(self, status_color, texts):
+        """Добавить запись в начало; самая старая запись сверх лимита удаляется"""
+        if len(self.rows) == self.rows.maxlen:
+            last = len(self.rows) - 1
+            self.beginRemoveRows(QModelIndex(), last, last)
+            self.rows.pop()
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.rows.appendleft((status_color, texts))
+        self.endInsertRows()
+
+
+class BarcodeTaskSignals(QObject):
+    """Сигналы фоновой отправки штрихкода (доставляются в главный поток)"""
+
+    # Ответы API и штрихкоды (в порядке сканирования)
+    finished = pyqtSignal(list, list)
+    # Текст ошибки и штрихкоды запроса
+    failed = pyqtSignal(str, list)
+
+
+class BarcodeTask(QRunnable):
+    """Отправка штрихкодов в API вне потока интерфейса
+
+    Один штрихкод отправляется обычным запросом, несколько - одним пакетным;
+    результаты всего запроса приходят одним сигналом.
+    """
+
+    def __init__(self, barcodes):
+        super().__init__()
+        self.barcodes = barcodes
+        self.signals = BarcodeTaskSignals()
+
+    def run(self):
+        try:
+            if len(self.barcodes) == 1:
+                response = SESSION.post(
+                    PROCESS_BARCODE_URL,
+                    data=orjson.dumps({"barcode": self.barcodes[0]}),
+                    headers=JSON_HEADERS,
+                    timeout=10
+                )
+            else:
+                response = SESSION.post(
+                    PROCESS_BARCODES_URL,
+                    data=orjson.dumps({"barcodes": self.barcodes}),
+                    headers=JSON_HEADERS,
+                    timeout=10
+                )
+
+            if response.status_code != 200:
+                self.fail(f"HTTP ошибка {response.status_code}")
+                return
+
+            data = orjson.loads(response.content)
+            results = [data] if len(self.barcodes) == 1 else data['results']
+            self.signals.finished.emit(results, self.barcodes)
+
+        except requests.exceptions.Timeout:
+            self.fail("Превышено время ожидания")
+        except requests.exceptions.ConnectionError:
+            self.fail("Ошибка подключения к серверу")
+        except Exception as e:
+            self.fail(f"Ошибка: {str(e)}")
+
+    def fail(self, error_message):
+        """Сообщить об ошибке для всех штрихкодов запроса"""
+        self.signals.failed.emit(error_message, self.barcodes)
+
+
 class BarcodeApp(QMainWindow):
     """Главное окно приложения"""
 
-    # Сигнал для обновления UI из другого потока
-    update_ui_signal = pyqtSignal(str)
     # Сигнал для обновления таблиц статистики
     update_stats_tables_signal = pyqtSignal(list, list)
+    # Сигнал завершения фоновой загрузки статистики (успешной или нет)
+    stats_loading_finished_signal = pyqtSignal()
+    # Сигнал результата проверки подключения к API (текст, цвет, есть ли подключение)
+    connection_status_signal = pyqtSignal(str, str, bool)
 
     def __init__(self):
         super().__init__()
 
-        # Sound Player
+        # Sound Player (инициализируется в фоне параллельно с проверкой API)
         self.sound_player = SoundPlayer()
-
-        # История сканирований
-        self.scan_history = []
+        self.sound_player.start()
 
         # Статистика за сегодня
         self.stats = {
@@ -202,6 +605,17 @@ class BarcodeApp(QMainWindow):
             'already_approved': 0
         }
 
+        # Последний отсканированный штрихкод и время (time.monotonic) - для отсева повторов
+        self.last_scan = ("", 0.0)
+
+        # Штрихкоды, ожидающие отправки, и таймер окна объединения в пакет
+        self.pending_barcodes = []
+        self.scan_pool = QThreadPool(self)
+        self.scan_pool.setMaxThreadCount(SCAN_THREADS)
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setSingleShot(True)
+        self.batch_timer.timeout.connect(self.flush_barcodes)
+
         # Дата для отслеживания смены дня
         self.current_date = datetime.now().date()
 
@@ -210,17 +624,46 @@ class BarcodeApp(QMainWindow):
         self.order_stats_data = []
         self.last_stats_update = None
         self.stats_loading = False
+        # Загрузку запросили, пока шла предыдущая
+        self.stats_reload_pending = False
+        # Данные, которыми заполнены таблицы статистики сейчас
+        self.shown_daily_stats = None
+        self.shown_order_stats = None
 
         self.init_ui()
 
-        # Подключаем сигнал для обновления таблиц
-        self.update_stats_tables_signal.connect(self.update_stats_tables)
+        # Счетчики и история сканирований за сегодня сохраняются на диск (с задержкой,
+        # чтобы серия сканирований записывалась один раз) и восстанавливаются при запуске
+        self.state_save_timer = QTimer(self)
+        self.state_save_timer.setSingleShot(True)
+        self.state_save_timer.timeout.connect(self.save_session_state)
+        self.restore_session_state()
 
-        # Проверка подключения к API при старте
-        QTimer.singleShot(500, self.check_api_connection)
+        # Подключаем сигналы для обновления таблиц и завершения загрузки
+        self.update_stats_tables_signal.connect(self.update_stats_tables)
+        self.stats_loading_finished_signal.connect(self.on_stats_loading_finished)
+
+        # Проверка подключения к API при старте и затем периодически (в пуле потоков).
+        # Пока API отвечает на сканирования, плановая проверка откладывается;
+        # после потери связи проверки идут чаще - с удвоением интервала
+        self.api_available = False
+        self.health_retry_ms = config.HEALTH_CHECK_RETRY_MIN_MS
+        self.connection_status_signal.connect(self.set_connection_status)
+        self.health_timer = QTimer(self)
+        self.health_timer.setSingleShot(True)
+        self.health_timer.timeout.connect(self.start_api_connection_check)
+        self.start_api_connection_check()
+
+        # Сразу показываем статистику из кеша прошлого запуска; свежий кеш не загружаем заново
+        cached = load_stats_cache(*stats_date_range())
+        if cached:
+            saved_at, self.daily_stats_data, self.order_stats_data = cached
+            self.last_stats_update = datetime.fromtimestamp(saved_at)
+            self.update_stats_tables(self.daily_stats_data, self.order_stats_data)
 
         # Запускаем загрузку статистики в фоне сразу после старта
-        QTimer.singleShot(1000, self.start_background_stats_loading)
+        if not cached or time.time() - cached[0] >= config.STATS_CACHE_TTL_SECONDS:
+            QTimer.singleShot(1000, self.start_background_stats_loading)
 
         # Настраиваем таймер для автоматического обновления статистики каждые 5 минут
         self.stats_timer = QTimer()
@@ -237,18 +680,17 @@ class BarcodeApp(QMainWindow):
         self.setCentralWidget(self.tabs)
 
         # Настройка шрифта для вкладок
-        tab_font = QFont()
-        tab_font.setPointSize(18)
-        tab_font.setBold(True)
+        tab_font = make_font(18, bold=True)
         self.tabs.setFont(tab_font)
 
-        # Создаем вкладки
+        # Создаем вкладки: содержимое вкладки статистики строится при первом открытии
         main_tab = self.create_main_tab()
-        stats_tab = self.create_stats_tab()
+        self.stats_tab = QWidget()
+        self.stats_tab_built = False
 
         # Добавляем вкладки
         self.tabs.addTab(main_tab, "Главное меню")
-        self.tabs.addTab(stats_tab, "Статистика")
+        self.tabs.addTab(self.stats_tab, "Статистика")
 
         # Подключаем обработчик переключения вкладок
         self.tabs.currentChanged.connect(self.on_tab_changed)
@@ -264,9 +706,7 @@ class BarcodeApp(QMainWindow):
 
         # === Заголовок ===
         title_label = QLabel("📦 Система учета готовности изделий")
-        title_font = QFont()
-        title_font.setPointSize(42)
-        title_font.setBold(True)
+        title_font = make_font(42, bold=True)
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignCenter)
         main_layout.addWidget(title_label)
@@ -274,34 +714,27 @@ class BarcodeApp(QMainWindow):
         # === Статус подключения ===
         self.connection_status = QLabel("🔴 Проверка подключения...")
         self.connection_status.setAlignment(Qt.AlignCenter)
-        status_font = QFont()
-        status_font.setPointSize(24)
-        status_font.setBold(True)
+        status_font = make_font(24, bold=True)
         self.connection_status.setFont(status_font)
         main_layout.addWidget(self.connection_status)
 
         # === Ввод штрихкода ===
         barcode_group = QGroupBox("Ввод штрихкода")
-        group_font = QFont()
-        group_font.setPointSize(24)
-        group_font.setBold(True)
+        group_font = make_font(24, bold=True)
         barcode_group.setFont(group_font)
         barcode_layout = QHBoxLayout()
         barcode_group.setLayout(barcode_layout)
 
         barcode_label = QLabel("Штрихкод:")
         barcode_label.setMinimumWidth(270)
-        label_font = QFont()
-        label_font.setPointSize(27)
-        label_font.setBold(True)
+        label_font = make_font(27, bold=True)
         barcode_label.setFont(label_font)
         barcode_layout.addWidget(barcode_label)
 
         self.barcode_input = QLineEdit()
         self.barcode_input.setPlaceholderText("Отсканируйте штрихкод или введите вручную...")
         self.barcode_input.returnPressed.connect(self.process_barcode)
-        barcode_font = QFont()
-        barcode_font.setPointSize(30)
+        barcode_font = make_font(30)
         self.barcode_input.setFont(barcode_font)
         self.barcode_input.setMinimumHeight(90)
         barcode_layout.addWidget(self.barcode_input)
@@ -310,9 +743,7 @@ class BarcodeApp(QMainWindow):
         process_btn.clicked.connect(self.process_barcode)
         process_btn.setMinimumHeight(90)
         process_btn.setMinimumWidth(300)
-        btn_font = QFont()
-        btn_font.setPointSize(27)
-        btn_font.setBold(True)
+        btn_font = make_font(27, bold=True)
         process_btn.setFont(btn_font)
         # Отключаем возможность установки фокуса на кнопку
         process_btn.setFocusPolicy(Qt.NoFocus)
@@ -322,18 +753,14 @@ class BarcodeApp(QMainWindow):
 
         # === Статистика за сегодня ===
         stats_group = QGroupBox("Статистика за сегодня")
-        stats_group_font = QFont()
-        stats_group_font.setPointSize(24)
-        stats_group_font.setBold(True)
+        stats_group_font = make_font(24, bold=True)
         stats_group.setFont(stats_group_font)
         stats_layout = QHBoxLayout()
         stats_group.setLayout(stats_layout)
 
         self.stats_label = QLabel(self.get_stats_text())
         self.stats_label.setAlignment(Qt.AlignCenter)
-        stats_font = QFont()
-        stats_font.setPointSize(24)
-        stats_font.setBold(True)
+        stats_font = make_font(24, bold=True)
         self.stats_label.setFont(stats_font)
         stats_layout.addWidget(self.stats_label)
 
@@ -341,48 +768,45 @@ class BarcodeApp(QMainWindow):
 
         # === История сканирований ===
         history_group = QGroupBox("История сканирований")
-        history_group_font = QFont()
-        history_group_font.setPointSize(24)
-        history_group_font.setBold(True)
+        history_group_font = make_font(24, bold=True)
         history_group.setFont(history_group_font)
         history_layout = QVBoxLayout()
         history_group.setLayout(history_layout)
 
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(10)
-        self.history_table.setHorizontalHeaderLabels([
-            "Статус", "Штрихкод", "Заказ", "Дата произв.", "Изделие", "Номер №", "Размеры", "Кол-во в заказе", "Кол-во готово", "Время"
-        ])
+        # Таблица отображает модель - ячейки не создаются отдельными объектами на каждую запись
+        self.history_model = HistoryModel(config.HISTORY_MAX_ROWS, self)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
 
         # Увеличиваем шрифт таблицы
-        table_font = QFont()
-        table_font.setPointSize(19)
+        table_font = make_font(19)
         self.history_table.setFont(table_font)
 
         # Увеличиваем шрифт заголовков
         header = self.history_table.horizontalHeader()
-        header_font = QFont()
-        header_font.setPointSize(21)
-        header_font.setBold(True)
+        header_font = make_font(21, bold=True)
         header.setFont(header_font)
 
-        # Настройка таблицы - автоматическое определение ширины для всех колонок
-        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # Статус
-        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)  # Штрихкод
-        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)  # Заказ
-        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)  # Дата производства
-        header.setSectionResizeMode(4, QHeaderView.ResizeToContents)  # Изделие
-        header.setSectionResizeMode(5, QHeaderView.ResizeToContents)  # Номер №
-        header.setSectionResizeMode(6, QHeaderView.ResizeToContents)  # Размеры
-        header.setSectionResizeMode(7, QHeaderView.ResizeToContents)  # Кол-во в заказе
-        header.setSectionResizeMode(8, QHeaderView.ResizeToContents)  # Кол-во готово
-        header.setSectionResizeMode(9, QHeaderView.ResizeToContents)  # Время
-
-        # Увеличиваем высоту строк
+        # Ширина колонок считается один раз по типичному содержимому и заголовку
+        # (ResizeToContents пересчитывал ее по всем строкам при каждом сканировании)
+        table_metrics = QFontMetrics(table_font)
+        status_metrics = QFontMetrics(make_font(19, bold=True))
+        header_metrics = QFontMetrics(header_font)
+        for column, sample in enumerate(HISTORY_COLUMN_SAMPLES):
+            metrics = status_metrics if column == 0 else table_metrics
+            width = max(metrics.horizontalAdvance(sample),
+                        header_metrics.horizontalAdvance(HistoryModel.HEADERS[column]))
+            header.setSectionResizeMode(column, QHeaderView.Interactive)
+            self.history_table.setColumnWidth(column, width + 30)
+        # Последняя колонка (Время) занимает оставшееся место
+        header.setStretchLastSection(True)
+
+        # Увеличиваем высоту строк (фиксированная - без запроса высоты у каждой строки)
+        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.history_table.verticalHeader().setDefaultSectionSize(60)
 
         self.history_table.setAlternatingRowColors(True)
-        self.history_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.history_table.setEditTriggers(QTableView.NoEditTriggers)
         # Отключаем возможность установки фокуса на таблицу
         self.history_table.setFocusPolicy(Qt.NoFocus)
 
@@ -392,9 +816,8 @@ class BarcodeApp(QMainWindow):
 
         return tab
 
-    def create_stats_tab(self):
-        """Создание вкладки со статистикой производства"""
-        tab = QWidget()
+    def create_stats_tab(self, tab):
+        """Построение содержимого вкладки со статистикой производства"""
         main_layout = QVBoxLayout()
         main_layout.setContentsMargins(5, 0, 5, 0)  # Убираем верхние и нижние отступы
         main_layout.setSpacing(0)  # Убираем расстояние между элементами
@@ -402,9 +825,7 @@ class BarcodeApp(QMainWindow):
 
         # === Заголовок ===
         title_label = QLabel("📊 Статистика производства")
-        title_font = QFont()
-        title_font.setPointSize(28)
-        title_font.setBold(True)
+        title_font = make_font(28, bold=True)
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignCenter)
         title_label.setContentsMargins(0, 0, 0, 0)
@@ -412,8 +833,7 @@ class BarcodeApp(QMainWindow):
 
         # === Информация о периоде ===
         period_label = QLabel("Отображается период: 2 дня назад - 5 дней вперёд")
-        period_font = QFont()
-        period_font.setPointSize(14)
+        period_font = make_font(14)
         period_label.setFont(period_font)
         period_label.setAlignment(Qt.AlignCenter)
         period_label.setContentsMargins(0, 0, 0, 0)
@@ -421,9 +841,7 @@ class BarcodeApp(QMainWindow):
 
         # === Метка последнего обновления ===
         self.last_update_label = QLabel("Загрузка данных...")
-        update_font = QFont()
-        update_font.setPointSize(14)
-        update_font.setItalic(True)
+        update_font = make_font(14, italic=True)
         self.last_update_label.setFont(update_font)
         self.last_update_label.setAlignment(Qt.AlignCenter)
         self.last_update_label.setStyleSheet("color: gray;")
@@ -434,9 +852,7 @@ class BarcodeApp(QMainWindow):
         refresh_btn = QPushButton("🔄 Обновить статистику")
         refresh_btn.clicked.connect(self.start_background_stats_loading)
         refresh_btn.setMinimumHeight(50)
-        btn_font = QFont()
-        btn_font.setPointSize(18)
-        btn_font.setBold(True)
+        btn_font = make_font(18, bold=True)
         refresh_btn.setFont(btn_font)
         refresh_btn.setFocusPolicy(Qt.NoFocus)
         main_layout.addWidget(refresh_btn)
@@ -447,37 +863,32 @@ class BarcodeApp(QMainWindow):
 
         # === Общая статистика по дням ===
         daily_group = QGroupBox("Общая статистика по дням")
-        daily_group_font = QFont()
-        daily_group_font.setPointSize(22)
-        daily_group_font.setBold(True)
+        daily_group_font = make_font(22, bold=True)
         daily_group.setFont(daily_group_font)
         daily_layout = QVBoxLayout()
         daily_group.setLayout(daily_layout)
 
-        self.daily_stats_table = QTableWidget()
-        self.daily_stats_table.setColumnCount(9)
-        self.daily_stats_table.setHorizontalHeaderLabels([
+        self.daily_stats_model = StatsTableModel([
             "Дата", "П.ПВХ", "С.ПВХ", "П.Рзд", "С.Рзд", "П.Стекл", "С.Стекл", "П.Итого", "С.Итого"
-        ])
+        ], self)
+        self.daily_stats_table = QTableView()
+        self.daily_stats_table.setModel(self.daily_stats_model)
 
         # Настройка шрифтов таблицы
-        table_font = QFont()
-        table_font.setPointSize(17)
+        table_font = make_font(17)
         self.daily_stats_table.setFont(table_font)
 
         header = self.daily_stats_table.horizontalHeader()
-        header_font = QFont()
-        header_font.setPointSize(19)
-        header_font.setBold(True)
+        header_font = make_font(19, bold=True)
         header.setFont(header_font)
 
-        # Автоматический размер колонок
+        # Размер колонок подбирается по содержимому один раз после заполнения таблицы
         for i in range(9):
-            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+            header.setSectionResizeMode(i, QHeaderView.Interactive)
 
         self.daily_stats_table.verticalHeader().setDefaultSectionSize(55)
         self.daily_stats_table.setAlternatingRowColors(True)
-        self.daily_stats_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.daily_stats_table.setEditTriggers(QTableView.NoEditTriggers)
         self.daily_stats_table.setFocusPolicy(Qt.NoFocus)
 
         daily_layout.addWidget(self.daily_stats_table)
@@ -485,18 +896,16 @@ class BarcodeApp(QMainWindow):
 
         # === Детальная статистика по заказам ===
         order_group = QGroupBox("Детальная статистика по заказам")
-        order_group_font = QFont()
-        order_group_font.setPointSize(22)
-        order_group_font.setBold(True)
+        order_group_font = make_font(22, bold=True)
         order_group.setFont(order_group_font)
         order_layout = QVBoxLayout()
         order_group.setLayout(order_layout)
 
-        self.order_stats_table = QTableWidget()
-        self.order_stats_table.setColumnCount(9)
-        self.order_stats_table.setHorizontalHeaderLabels([
+        self.order_stats_model = StatsTableModel([
             "Заказ", "Дата", "П.ПВХ", "С.ПВХ", "П.Рзд", "С.Рзд", "П.Стекл", "С.Стекл", "Коммент."
-        ])
+        ], self)
+        self.order_stats_table = QTableView()
+        self.order_stats_table.setModel(self.order_stats_model)
 
         # Настройка шрифтов таблицы
         self.order_stats_table.setFont(table_font)
@@ -504,15 +913,15 @@ class BarcodeApp(QMainWindow):
         header2 = self.order_stats_table.horizontalHeader()
         header2.setFont(header_font)
 
-        # Автоматический размер колонок
+        # Размер колонок подбирается по содержимому один раз после заполнения таблицы
         for i in range(8):
-            header2.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+            header2.setSectionResizeMode(i, QHeaderView.Interactive)
         # Последний столбец "Коммент." растягивается на всё оставшееся место
         header2.setSectionResizeMode(8, QHeaderView.Stretch)
 
         self.order_stats_table.verticalHeader().setDefaultSectionSize(55)
         self.order_stats_table.setAlternatingRowColors(True)
-        self.order_stats_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.order_stats_table.setEditTriggers(QTableView.NoEditTriggers)
         self.order_stats_table.setFocusPolicy(Qt.NoFocus)
 
         order_layout.addWidget(self.order_stats_table)
@@ -521,11 +930,12 @@ class BarcodeApp(QMainWindow):
         # Устанавливаем начальное соотношение размеров (50/50)
         splitter.setSizes([500, 500])
 
-        return tab
-
     def on_tab_changed(self, index):
         """Обработчик переключения вкладок"""
         if index == 1:  # Вкладка "Статистика"
+            if not self.stats_tab_built:
+                self.create_stats_tab(self.stats_tab)
+                self.stats_tab_built = True
             # Принудительно обновляем таблицы из кеша
             self.update_stats_tables(self.daily_stats_data, self.order_stats_data)
         elif index == 0:  # Вкладка "Главное меню"
@@ -534,48 +944,37 @@ class BarcodeApp(QMainWindow):
     def start_background_stats_loading(self):
         """Запуск фоновой загрузки статистики"""
         if self.stats_loading:
-            print("Загрузка статистики уже выполняется, пропускаем...")
+            # Запрос во время загрузки не теряется: после нее загрузка выполнится еще раз (один)
+            logger.debug("Загрузка статистики уже выполняется, повторим после нее")
+            self.stats_reload_pending = True
             return
 
         self.stats_loading = True
 
-        # Обновляем метку сразу же
-        self.last_update_label.setText("Идет загрузка данных...")
-        self.last_update_label.setStyleSheet("color: orange;")
+        # Обновляем метку сразу же (если вкладка статистики уже открывалась)
+        if self.stats_tab_built:
+            self.last_update_label.setText("Идет загрузка данных...")
+            self.last_update_label.setStyleSheet("color: orange;")
 
-        # Запускаем загрузку в отдельном потоке
-        thread = threading.Thread(target=self.load_statistics_background, daemon=True)
-        thread.start()
+        # Запускаем загрузку в потоках статистики (не занимая потоки сканирований и общего пула)
+        STATS_EXECUTOR.submit(self.load_statistics_background)
 
     def load_statistics_background(self):
         """Загрузка статистики в фоновом режиме"""
         try:
-            # Рассчитываем даты: 2 дня назад - 5 дней вперёд
-            today = datetime.now()
-            start_date = (today - timedelta(days=2)).strftime('%Y-%m-%d')
-            end_date = (today + timedelta(days=5)).strftime('%Y-%m-%d')
-
-            # Загрузка общей статистики по дням
-            daily_url = f"{config.API_BASE_URL}{config.API_DAILY_STATS_ENDPOINT}"
-            daily_params = {'start_date': start_date, 'end_date': end_date}
-
-            daily_response = requests.get(daily_url, params=daily_params, timeout=10)
-            daily_data = []
-            if daily_response.status_code == 200:
-                daily_json = daily_response.json()
-                if daily_json.get('success'):
-                    daily_data = daily_json.get('data', [])
-
-            # Загрузка детальной статистики по заказам
-            order_url = f"{config.API_BASE_URL}{config.API_ORDER_STATS_ENDPOINT}"
-            order_params = {'start_date': start_date, 'end_date': end_date}
-
-            order_response = requests.get(order_url, params=order_params, timeout=10)
-            order_data = []
-            if order_response.status_code == 200:
-                order_json = order_response.json()
-                if order_json.get('success'):
-                    order_data = order_json.get('data', [])
+            start_date, end_date = stats_date_range()
+            params = {'start_date': start_date, 'end_date': end_date}
+
+            # Статистика по заказам загружается параллельно со статистикой по дням
+            order_future = STATS_EXECUTOR.submit(fetch_stats, ORDER_STATS_URL, params)
+            daily_data = fetch_stats(DAILY_STATS_URL, params)
+            order_data = order_future.result()
+
+            # В кеш попадает только полностью загруженная статистика
+            if daily_data is not None and order_data is not None:
+                save_stats_cache(start_date, end_date, daily_data, order_data)
+            daily_data = daily_data or []
+            order_data = order_data or []
 
             # Сохраняем данные и время обновления
             self.daily_stats_data = daily_data
@@ -586,12 +985,23 @@ class BarcodeApp(QMainWindow):
             self.update_stats_tables_signal.emit(daily_data, order_data)
 
         except Exception as e:
-            print(f"Ошибка фоновой загрузки статистики: {e}")
+            logger.error("Ошибка фоновой загрузки статистики: %s", e)
         finally:
-            self.stats_loading = False
+            self.stats_loading_finished_signal.emit()
+
+    def on_stats_loading_finished(self):
+        """Фоновая загрузка статистики завершена (главный поток)"""
+        self.stats_loading = False
+        if self.stats_reload_pending:
+            self.stats_reload_pending = False
+            self.start_background_stats_loading()
 
     def update_stats_tables(self, daily_data, order_data):
         """Обновление таблиц статистики в главном потоке"""
+        # Вкладка еще не открывалась - таблицы заполнятся из сохраненных данных при открытии
+        if not self.stats_tab_built:
+            return
+
         # Обновляем метку последнего обновления
         if self.last_stats_update:
             time_str = self.last_stats_update.strftime('%d.%m.%Y %H:%M:%S')
@@ -604,179 +1014,25 @@ class BarcodeApp(QMainWindow):
             self.last_update_label.setText("Данные не загружены")
             self.last_update_label.setStyleSheet("color: gray;")
 
-        # Заполняем таблицы
-        self.populate_daily_stats_table(daily_data)
-        self.populate_order_stats_table(order_data)
+        # Заполняем таблицы (если данные не изменились с прошлого заполнения - таблицы не трогаем)
+        if daily_data != self.shown_daily_stats:
+            self.populate_daily_stats_table(daily_data)
+            self.shown_daily_stats = daily_data
+        if order_data != self.shown_order_stats:
+            self.populate_order_stats_table(order_data)
+            self.shown_order_stats = order_data
 
     def populate_daily_stats_table(self, data):
         """Заполнение таблицы общей статистики"""
-        self.daily_stats_table.setRowCount(0)
-
-        for row_data in data:
-            row_position = self.daily_stats_table.rowCount()
-            self.daily_stats_table.insertRow(row_position)
-
-            # Дата (форматируем в день.месяц.год)
-            proddate = row_data['proddate']
-            try:
-                # Пробуем распарсить дату
-                if isinstance(proddate, str):
-                    date_obj = datetime.strptime(proddate, '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%d.%m.%Y')
-                else:
-                    formatted_date = proddate
-            except:
-                formatted_date = proddate
-
-            date_item = QTableWidgetItem(formatted_date)
-            date_item.setTextAlignment(Qt.AlignCenter)
-            self.daily_stats_table.setItem(row_position, 0, date_item)
-
-            # План ПВХ (колонка 1)
-            planned_pvh = row_data['planned_pvh']
-            planned_pvh_item = QTableWidgetItem(str(planned_pvh))
-            planned_pvh_item.setTextAlignment(Qt.AlignCenter)
-            self.daily_stats_table.setItem(row_position, 1, planned_pvh_item)
-
-            # Сделано ПВХ (колонка 2) с цветовой индикацией
-            completed_pvh = row_data['completed_pvh']
-            completed_pvh_item = QTableWidgetItem(str(completed_pvh))
-            completed_pvh_item.setTextAlignment(Qt.AlignCenter)
-            if planned_pvh > 0:
-                if completed_pvh >= planned_pvh:
-                    completed_pvh_item.setForeground(QColor(0, 200, 0))  # Зеленый
-                elif completed_pvh > 0:
-                    completed_pvh_item.setForeground(QColor(255, 165, 0))  # Оранжевый
-            self.daily_stats_table.setItem(row_position, 2, completed_pvh_item)
-
-            # План Раздвижки (колонка 3)
-            planned_razdv = row_data['planned_razdv']
-            planned_razdv_item = QTableWidgetItem(str(planned_razdv))
-            planned_razdv_item.setTextAlignment(Qt.AlignCenter)
-            self.daily_stats_table.setItem(row_position, 3, planned_razdv_item)
-
-            # Сделано Раздвижки (колонка 4) с цветовой индикацией
-            completed_razdv = row_data['completed_razdv']
-            completed_razdv_item = QTableWidgetItem(str(completed_razdv))
-            completed_razdv_item.setTextAlignment(Qt.AlignCenter)
-            if planned_razdv > 0:
-                if completed_razdv >= planned_razdv:
-                    completed_razdv_item.setForeground(QColor(0, 200, 0))  # Зеленый
-                elif completed_razdv > 0:
-                    completed_razdv_item.setForeground(QColor(255, 165, 0))  # Оранжевый
-            self.daily_stats_table.setItem(row_position, 4, completed_razdv_item)
-
-            # План Стеклопакетов (колонка 5)
-            planned_glass = row_data.get('planned_glass', 0)
-            planned_glass_item = QTableWidgetItem(str(planned_glass))
-            planned_glass_item.setTextAlignment(Qt.AlignCenter)
-            self.daily_stats_table.setItem(row_position, 5, planned_glass_item)
-
-            # Сделано Стеклопакетов (колонка 6) с цветовой индикацией
-            completed_glass = row_data.get('completed_glass', 0)
-            completed_glass_item = QTableWidgetItem(str(completed_glass))
-            completed_glass_item.setTextAlignment(Qt.AlignCenter)
-            if planned_glass > 0:
-                if completed_glass >= planned_glass:
-                    completed_glass_item.setForeground(QColor(0, 200, 0))  # Зеленый
-                elif completed_glass > 0:
-                    completed_glass_item.setForeground(QColor(255, 165, 0))  # Оранжевый
-            self.daily_stats_table.setItem(row_position, 6, completed_glass_item)
-
-            # Итого План (колонка 7) - сумма ПВХ, Раздвижки и Стеклопакетов
-            total_planned = planned_pvh + planned_razdv + planned_glass
-            total_planned_item = QTableWidgetItem(str(total_planned))
-            total_planned_item.setTextAlignment(Qt.AlignCenter)
-            self.daily_stats_table.setItem(row_position, 7, total_planned_item)
-
-            # Итого Сделано (колонка 8) - сумма ПВХ, Раздвижки и Стеклопакетов с цветовой индикацией
-            total_completed = completed_pvh + completed_razdv + completed_glass
-            total_completed_item = QTableWidgetItem(str(total_completed))
-            total_completed_item.setTextAlignment(Qt.AlignCenter)
-            if total_planned > 0:
-                if total_completed >= total_planned:
-                    total_completed_item.setForeground(QColor(0, 200, 0))  # Зеленый
-                elif total_completed > 0:
-                    total_completed_item.setForeground(QColor(255, 165, 0))  # Оранжевый
-            self.daily_stats_table.setItem(row_position, 8, total_completed_item)
+        self.daily_stats_model.set_rows([daily_stats_row(row_data) for row_data in data])
+        # Ширина колонок считается один раз после заполнения
+        self.daily_stats_table.resizeColumnsToContents()
 
     def populate_order_stats_table(self, data):
         """Заполнение таблицы детальной статистики"""
-        self.order_stats_table.setRowCount(0)
-
-        for row_data in data:
-            row_position = self.order_stats_table.rowCount()
-            self.order_stats_table.insertRow(row_position)
-
-            # Номер заказа (колонка 0)
-            order_item = QTableWidgetItem(row_data['order_number'])
-            order_item.setTextAlignment(Qt.AlignCenter)
-            self.order_stats_table.setItem(row_position, 0, order_item)
-
-            # Дата производства (колонка 1) - форматируем в день.месяц.год
-            proddate = row_data['proddate']
-            try:
-                if isinstance(proddate, str):
-                    date_obj = datetime.strptime(proddate, '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%d.%m.%Y')
-                else:
-                    formatted_date = proddate
-            except:
-                formatted_date = proddate
-            date_item = QTableWidgetItem(formatted_date)
-            date_item.setTextAlignment(Qt.AlignCenter)
-            self.order_stats_table.setItem(row_position, 1, date_item)
-
-            # План ПВХ (колонка 2)
-            planned_pvh_item = QTableWidgetItem(str(row_data['planned_pvh']))
-            planned_pvh_item.setTextAlignment(Qt.AlignCenter)
-            self.order_stats_table.setItem(row_position, 2, planned_pvh_item)
-
-            # Сделано ПВХ (колонка 3) с цветовой индикацией
-            completed_pvh_item = QTableWidgetItem(str(row_data['completed_pvh']))
-            completed_pvh_item.setTextAlignment(Qt.AlignCenter)
-            if row_data['planned_pvh'] > 0:
-                if row_data['completed_pvh'] >= row_data['planned_pvh']:
-                    completed_pvh_item.setForeground(QColor(0, 200, 0))  # Зеленый
-                elif row_data['completed_pvh'] > 0:
-                    completed_pvh_item.setForeground(QColor(255, 165, 0))  # Оранжевый
-            self.order_stats_table.setItem(row_position, 3, completed_pvh_item)
-
-            # План Раздвижки (колонка 4)
-            planned_razdv_item = QTableWidgetItem(str(row_data['planned_razdv']))
-            planned_razdv_item.setTextAlignment(Qt.AlignCenter)
-            self.order_stats_table.setItem(row_position, 4, planned_razdv_item)
-
-            # Сделано Раздвижки (колонка 5) с цветовой индикацией
-            completed_razdv_item = QTableWidgetItem(str(row_data['completed_razdv']))
-            completed_razdv_item.setTextAlignment(Qt.AlignCenter)
-            if row_data['planned_razdv'] > 0:
-                if row_data['completed_razdv'] >= row_data['planned_razdv']:
-                    completed_razdv_item.setForeground(QColor(0, 200, 0))  # Зеленый
-                elif row_data['completed_razdv'] > 0:
-                    completed_razdv_item.setForeground(QColor(255, 165, 0))  # Оранжевый
-            self.order_stats_table.setItem(row_position, 5, completed_razdv_item)
-
-            # План Стеклопакетов (колонка 6)
-            planned_glass_item = QTableWidgetItem(str(row_data.get('planned_glass', 0)))
-            planned_glass_item.setTextAlignment(Qt.AlignCenter)
-            self.order_stats_table.setItem(row_position, 6, planned_glass_item)
-
-            # Сделано Стеклопакетов (колонка 7) с цветовой индикацией
-            completed_glass_item = QTableWidgetItem(str(row_data.get('completed_glass', 0)))
-            completed_glass_item.setTextAlignment(Qt.AlignCenter)
-            if row_data.get('planned_glass', 0) > 0:
-                if row_data.get('completed_glass', 0) >= row_data.get('planned_glass', 0):
-                    completed_glass_item.setForeground(QColor(0, 200, 0))  # Зеленый
-                elif row_data.get('completed_glass', 0) > 0:
-                    completed_glass_item.setForeground(QColor(255, 165, 0))  # Оранжевый
-            self.order_stats_table.setItem(row_position, 7, completed_glass_item)
-
-            # Комментарий (колонка 8)
-            comment = row_data.get('comment', '') or ''
-            comment_item = QTableWidgetItem(comment.strip())
-            comment_item.setTextAlignment(Qt.AlignCenter)
-            self.order_stats_table.setItem(row_position, 8, comment_item)
+        self.order_stats_model.set_rows([order_stats_row(row_data) for row_data in data])
+        # Ширина колонок считается один раз после заполнения
+        self.order_stats_table.resizeColumnsToContents()
 
     def show_error(self, title, message):
         """Показать диалог с ошибкой"""
@@ -800,48 +1056,60 @@ class BarcodeApp(QMainWindow):
     
     def get_stats_text(self):
         """Получить текст статистики"""
-        return (f"Всего: {self.stats['total']} | "
-                f"✅ Успешно: {self.stats['success']} | "
-                f"⚠️ Уже оприходовано: {self.stats['already_approved']} | "
-                f"❌ Ошибок: {self.stats['failed']}")
+        stats = self.stats
+        return STATS_TEXT_TEMPLATE % (
+            stats['total'], stats['success'], stats['already_approved'], stats['failed']
+        )
     
+    def set_connection_status(self, text, color, available):
+        """Показать результат проверки подключения и запланировать следующую (главный поток)"""
+        self.connection_status.setText(text)
+        self.connection_status.setStyleSheet(f"color: {color};")
+
+        self.api_available = available
+        if available:
+            self.health_retry_ms = config.HEALTH_CHECK_RETRY_MIN_MS
+            self.health_timer.start(config.HEALTH_CHECK_INTERVAL_MS)
+        else:
+            self.health_timer.start(self.health_retry_ms)
+            self.health_retry_ms = min(self.health_retry_ms * 2, config.HEALTH_CHECK_INTERVAL_MS)
+
+    def start_api_connection_check(self):
+        """Запустить проверку подключения к API в пуле потоков"""
+        QThreadPool.globalInstance().start(self.check_api_connection)
+
     def check_api_connection(self):
-        """Проверка подключения к API"""
+        """Проверка подключения к API (выполняется в пуле потоков)"""
         try:
-            url = f"{config.API_BASE_URL}{config.API_HEALTH_ENDPOINT}"
-            print(f"Проверка подключения к API: {url}")
+            url = HEALTH_URL
+            logger.info("Проверка подключения к API: %s", url)
 
-            response = requests.get(url, timeout=15)
-            print(f"Ответ от API: status_code={response.status_code}")
+            response = SESSION.get(url, timeout=15)
+            logger.debug("Ответ от API: status_code=%s", response.status_code)
 
             if response.status_code == 200:
-                data = response.json()
-                print(f"Данные от API: {data}")
+                data = orjson.loads(response.content)
+                logger.debug("Данные от API: %s", data)
 
                 api_version = data.get('api_version', 'unknown')
-                print(f"Версия API: {api_version}")
+                logger.info("Версия API: %s", api_version)
 
                 if data.get('database_connected'):
-                    self.connection_status.setText("🟢 Программа готова к работе")
-                    self.connection_status.setStyleSheet("color: green;")
-                    print("✓ API и база данных работают")
+                    self.connection_status_signal.emit("🟢 Программа готова к работе", "green", True)
+                    logger.info("API и база данных работают")
                 else:
-                    self.connection_status.setText("🔴 Ошибка подключения к БД")
-                    self.connection_status.setStyleSheet("color: red;")
-                    print("✗ API работает, но нет подключения к БД")
+                    self.connection_status_signal.emit("🔴 Ошибка подключения к БД", "red", False)
+                    logger.error("API работает, но нет подключения к БД")
             else:
-                self.connection_status.setText("🔴 Ошибка подключения")
-                self.connection_status.setStyleSheet("color: red;")
-                print(f"✗ API вернул ошибку: {response.status_code}")
+                self.connection_status_signal.emit("🔴 Ошибка подключения", "red", False)
+                logger.error("API вернул ошибку: %s", response.status_code)
         except requests.exceptions.ConnectionError as e:
-            self.connection_status.setText("🔴 API сервер недоступен")
-            self.connection_status.setStyleSheet("color: red;")
-            print(f"✗ Не удалось подключиться к API: {e}")
+            self.connection_status_signal.emit("🔴 API сервер недоступен", "red", False)
+            logger.error("Не удалось подключиться к API: %s", e)
         except Exception as e:
-            self.connection_status.setText("🔴 Ошибка подключения")
-            self.connection_status.setStyleSheet("color: red;")
-            print(f"✗ Ошибка проверки подключения: {type(e).__name__}: {e}")
-    
+            self.connection_status_signal.emit("🔴 Ошибка подключения", "red", False)
+            logger.error("Ошибка проверки подключения: %s: %s", type(e).__name__, e)
+
     def process_barcode(self):
         """Обработка штрихкода"""
         barcode = self.barcode_input.text().strip()
@@ -852,6 +1120,13 @@ class BarcodeApp(QMainWindow):
         # Очищаем поле ввода
         self.barcode_input.clear()
 
+        # Сканер (или залипшая клавиша) может повторить тот же штрихкод - повтор отбрасываем
+        now = time.monotonic()
+        last_barcode, last_time = self.last_scan
+        self.last_scan = (barcode, now)
+        if barcode == last_barcode and now - last_time < config.DUPLICATE_SCAN_INTERVAL:
+            return
+
         # Проверяем, не сменился ли день - если да, сбрасываем статистику
         today = datetime.now().date()
         if today != self.current_date:
@@ -865,34 +1140,92 @@ class BarcodeApp(QMainWindow):
 
         # Обновляем статистику
         self.stats['total'] += 1
-        
+
+        # Заведомо некорректный штрихкод отклоняем без запроса к API
+        if not BARCODE_RE.match(barcode):
+            self.on_barcode_failed("Некорректный штрихкод", [barcode])
+            return
+
+        # Сканирования, пришедшие подряд, копятся и отправляются одним запросом
+        self.pending_barcodes.append(barcode)
+        if len(self.pending_barcodes) >= config.BARCODE_BATCH_MAX:
+            self.flush_barcodes()
+        elif not self.batch_timer.isActive():
+            self.batch_timer.start(config.BARCODE_BATCH_WINDOW_MS)
+
+    def flush_barcodes(self):
+        """Отправить накопленные штрихкоды в API в пуле потоков - интерфейс не ждет ответа"""
+        self.batch_timer.stop()
+        barcodes, self.pending_barcodes = self.pending_barcodes, []
+        if not barcodes:
+            return
+
+        task = BarcodeTask(barcodes)
+        task.signals.finished.connect(self.on_barcode_processed)
+        task.signals.failed.connect(self.on_barcode_failed)
+        task.signals.failed.connect(self.on_api_request_failed)
+        self.scan_pool.start(task)
+    
+    def on_barcode_processed(self, results, barcodes):
+        """Ответы API на штрихкоды получены (главный поток)"""
+        # Все записи пакета попадают в таблицу одной перерисовкой
+        self.history_table.setUpdatesEnabled(False)
         try:
-            # Отправляем запрос к API
-            response = requests.post(
-                f"{config.API_BASE_URL}{config.API_PROCESS_BARCODE_ENDPOINT}",
-                json={"barcode": barcode},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
+            for data, barcode in zip(results, barcodes):
                 self.handle_response(data, barcode)
-            else:
-                self.handle_error(f"HTTP ошибка {response.status_code}", barcode)
-                
-        except requests.exceptions.Timeout:
-            self.handle_error("Превышено время ожидания", barcode)
-        except requests.exceptions.ConnectionError:
-            self.handle_error("Ошибка подключения к серверу", barcode)
+        finally:
+            self.history_table.setUpdatesEnabled(True)
+        self.stats_label.setText(self.get_stats_text())
+        self.schedule_session_state_save()
+
+        # API только что ответил - отдельная проверка подключения пока не нужна
+        if self.api_available:
+            self.health_timer.start(config.HEALTH_CHECK_INTERVAL_MS)
+
+    def on_barcode_failed(self, error_message, barcodes):
+        """Запрос штрихкодов к API завершился ошибкой (главный поток)"""
+        self.history_table.setUpdatesEnabled(False)
+        try:
+            for barcode in barcodes:
+                self.handle_error(error_message, barcode)
+        finally:
+            self.history_table.setUpdatesEnabled(True)
+        self.stats_label.setText(self.get_stats_text())
+        self.schedule_session_state_save()
+
+    def on_api_request_failed(self, error_message, barcodes):
+        """Запрос к API не выполнен - сразу проверяем подключение (главный поток)"""
+        if self.api_available:
+            self.health_timer.start(0)
+
+    def schedule_session_state_save(self):
+        """Запланировать сохранение счетчиков и истории (одна запись на серию сканирований)"""
+        if not self.state_save_timer.isActive():
+            self.state_save_timer.start(1000)
+
+    def save_session_state(self):
+        """Сохранить счетчики и историю сканирований за сегодня на диск"""
+        self.state_save_timer.stop()
+        write_json_file(SESSION_STATE_PATH, {
+            'date': self.current_date.isoformat(),
+            'stats': self.stats,
+            'history': self.history_model.snapshot(),
+        })
+
+    def restore_session_state(self):
+        """Восстановить счетчики и историю, если они сохранены сегодня"""
+        state = read_json_file(SESSION_STATE_PATH)
+        if not state or state.get('date') != self.current_date.isoformat():
+            return
+        try:
+            stats = {key: int(state['stats'][key]) for key in self.stats}
+            self.history_model.restore(state['history'])
+            self.stats.update(stats)
         except Exception as e:
-            self.handle_error(f"Ошибка: {str(e)}", barcode)
-        
-        # Обновляем статистику
+            logger.warning("Сохраненное состояние сканирований не восстановлено: %s", e)
+            return
         self.stats_label.setText(self.get_stats_text())
-        
-        # Устанавливаем фокус обратно на поле ввода
-        self.barcode_input.setFocus()
-    
+
     def handle_response(self, data, barcode):
         """Обработка успешного ответа от API"""
         success = data.get('success', False)
@@ -900,45 +1233,13 @@ class BarcodeApp(QMainWindow):
         voice_message = data.get('voice_message', '')
         product_info = data.get('product_info')
 
-        # Диагностика: выводим полученные данные
-        print(f"DEBUG: Получен ответ от API:")
-        print(f"  success: {success}")
-        print(f"  product_info: {product_info}")
-        if product_info:
-            print(f"  total_items_in_order: {product_info.get('total_items_in_order')}")
-            print(f"  approved_items_in_order: {product_info.get('approved_items_in_order')}")
-        
-        message_lower = message.lower()
-        is_already_ready = (
-            "уже было отмечено готовым" in message_lower
-            or "уже был отмечен готовым" in message_lower
-        )
-        is_already_shipped = ("уже отмечен отгруженным" in message_lower) or ("уже отгружен" in message_lower)
-        is_not_ready = "еще не готов" in message_lower
+        logger.debug("Ответ API на %s: success=%s, product_info=%s", barcode, success, product_info)
+
+        # Код результата приходит от API в поле status
+        status_code = 'ok' if success else data.get('status')
+        status, status_color, stats_key, sound_type = STATUS_VIEWS.get(status_code, STATUS_VIEWS['error'])
+        self.stats[stats_key] += 1
 
-        if success:
-            self.stats['success'] += 1
-            status = "✅ Успех"
-            status_color = QColor(0, 200, 0)
-        else:
-            # Проверяем, это уже приходованное изделие, уже отгруженный заказ или ошибка
-            if is_already_ready:
-                self.stats['already_approved'] += 1
-                status = "⚠️ Уже оприходовано"
-                status_color = QColor(255, 165, 0)
-            elif is_already_shipped:
-                self.stats['already_approved'] += 1
-                status = "⚠️ Уже отгружен"
-                status_color = QColor(255, 165, 0)
-            elif is_not_ready:
-                self.stats['failed'] += 1
-                status = "⏳ Еще не готов"
-                status_color = QColor(255, 0, 0)
-            else:
-                self.stats['failed'] += 1
-                status = "❌ Ошибка"
-                status_color = QColor(255, 0, 0)
-        
         # Добавляем в историю
         self.add_to_history(
             status=status,
@@ -948,19 +1249,8 @@ class BarcodeApp(QMainWindow):
             barcode=barcode
         )
 
-        # Воспроизводим соответствующий звук в отдельном потоке
-        if success:
-            sound_type = 'success'
-        elif is_already_ready or is_already_shipped:
-            sound_type = 'already_approved'
-        else:
-            sound_type = 'error'
-
-        threading.Thread(
-            target=self.sound_player.play_sound,
-            args=(sound_type,),
-            daemon=True
-        ).start()
+        # Channel.play() не блокирует - звук микшируется в фоне самим pygame
+        self.sound_player.play_sound(sound_type)
     
     def handle_error(self, error_message, barcode):
         """Обработка ошибки"""
@@ -968,112 +1258,80 @@ class BarcodeApp(QMainWindow):
         
         self.add_to_history(
             status="❌ Ошибка",
-            status_color=QColor(255, 0, 0),
+            status_color=COLOR_ERROR,
             message=error_message,
             product_info=None,
             barcode=barcode
         )
 
         # Воспроизводим звук ошибки
-        threading.Thread(
-            target=self.sound_player.play_sound,
-            args=('error',),
-            daemon=True
-        ).start()
+        self.sound_player.play_sound('error')
     
     def add_to_history(self, status, status_color, message, product_info, barcode=""):
         """Добавить запись в историю"""
-        current_time = datetime.now().strftime("%H:%M:%S")
-
-        self.history_table.insertRow(0)  # Добавляем в начало
+        current_time = time.strftime("%H:%M:%S")
 
         # Порядок столбцов: "Статус", "Штрихкод", "Заказ", "Дата произв.", "Изделие", "Номер №", "Размеры", "Кол-во в заказе", "Кол-во готово", "Время"
-
-        # Статус (колонка 0)
-        status_item = QTableWidgetItem(status)
-        status_item.setForeground(status_color)
-        status_item.setTextAlignment(Qt.AlignCenter)
-        font = QFont()
-        font.setPointSize(19)
-        font.setBold(True)
-        status_item.setFont(font)
-        self.history_table.setItem(0, 0, status_item)
-
-        # Штрихкод (колонка 1)
-        barcode_item = QTableWidgetItem(barcode)
-        barcode_item.setTextAlignment(Qt.AlignCenter)
-        self.history_table.setItem(0, 1, barcode_item)
-
         if product_info:
-            # Заказ (колонка 2)
-            order_num = product_info.get('order_number') or '-'
-            order_item = QTableWidgetItem(order_num)
-            order_item.setTextAlignment(Qt.AlignCenter)
-            self.history_table.setItem(0, 2, order_item)
-
-            # Дата производства (колонка 3)
-            proddate = product_info.get('proddate') or '-'
-            proddate_item = QTableWidgetItem(proddate)
-            proddate_item.setTextAlignment(Qt.AlignCenter)
-            self.history_table.setItem(0, 3, proddate_item)
-
-            # Изделие (колонка 4)
-            construction_num = product_info.get('construction_number') or '-'
-            construction_item = QTableWidgetItem(construction_num)
-            construction_item.setTextAlignment(Qt.AlignCenter)
-            self.history_table.setItem(0, 4, construction_item)
-
-            # Номер № (колонка 5)
-            item_number = product_info.get('item_number')
-            qty = product_info.get('qty')
+            get = product_info.get
+
+            # Номер №
+            item_number = get('item_number')
+            qty = get('qty')
             if item_number is not None and qty is not None:
-                item_num = f"{item_number} / {qty}"
+                item_num = "%s / %s" % (item_number, qty)
             else:
                 item_num = "-"
-            item_num_item = QTableWidgetItem(item_num)
-            item_num_item.setTextAlignment(Qt.AlignCenter)
-            self.history_table.setItem(0, 5, item_num_item)
 
-            # Размеры (колонка 6)
-            width = product_info.get('width', 0)
-            height = product_info.get('height', 0)
+            # Размеры
+            width = get('width', 0)
+            height = get('height', 0)
             if width and height:
-                size_str = f"{width} x {height}"
+                size_str = "%s x %s" % (width, height)
             else:
                 size_str = "-"
-            size_item = QTableWidgetItem(size_str)
-            size_item.setTextAlignment(Qt.AlignCenter)
-            self.history_table.setItem(0, 6, size_item)
-
-            # Кол-во изделий в заказе (колонка 7)
-            total_items = product_info.get('total_items_in_order')
-            total_items_item = QTableWidgetItem(str(total_items) if total_items is not None else "-")
-            total_items_item.setTextAlignment(Qt.AlignCenter)
-            self.history_table.setItem(0, 7, total_items_item)
-
-            # Проведено изделий в заказе (колонка 8)
-            approved_items = product_info.get('approved_items_in_order')
-            approved_items_item = QTableWidgetItem(str(approved_items) if approved_items is not None else "-")
-            approved_items_item.setTextAlignment(Qt.AlignCenter)
-            self.history_table.setItem(0, 8, approved_items_item)
+
+            total_items = get('total_items_in_order')
+            approved_items = get('approved_items_in_order')
+
+            product_texts = (
+                get('order_number') or '-',
+                get('proddate') or '-',
+                get('construction_number') or '-',
+                item_num,
+                size_str,
+                str(total_items) if total_items is not None else "-",
+                str(approved_items) if approved_items is not None else "-",
+            )
         else:
-            for col in range(2, 9):
-                empty_item = QTableWidgetItem("-")
-                empty_item.setTextAlignment(Qt.AlignCenter)
-                self.history_table.setItem(0, col, empty_item)
+            product_texts = ("-",) * 7
 
-        # Время (колонка 9)
-        time_item = QTableWidgetItem(current_time)
-        time_item.setTextAlignment(Qt.AlignCenter)
-        self.history_table.setItem(0, 9, time_item)
+        # Лимит HISTORY_MAX_ROWS соблюдает модель
+        self.history_model.prepend(status_color, (status, barcode) + product_texts + (current_time,))
 
-        # Ограничиваем историю до 100 записей
-        if self.history_table.rowCount() > 100:
-            self.history_table.removeRow(100)
+    def closeEvent(self, event):
+        """Закрытие окна - сохраняем состояние и освобождаем соединения HTTP-сессий"""
+        self.save_session_state()
+        SESSION.close()
+        STATS_SESSION.close()
+        super().closeEvent(event)
 
 
 def main():
     """Точка входа в приложение"""
+    # Сообщения ниже WARNING (диагностика сканирований и звука) не выводятся.
+    # Собранное приложение работает без консоли, поэтому журнал пишется в файл (с ротацией)
+    log_handlers = [logging.handlers.RotatingFileHandler(
+        LOG_FILE_PATH, maxBytes=1024 * 1024, backupCount=3, encoding='utf-8'
+    )]
+    if sys.stderr is not None:
+        log_handlers.append(logging.StreamHandler())
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=log_handlers
+    )
+
     print("="*60)
     print("Запуск клиентского приложения...")
     print(f"API URL: {config.API_BASE_URL}")
@@ -1088,15 +1346,13 @@ def main():
     # Устанавливаем стиль приложения
     app.setStyle('Fusion')
     
-    # Создаем иконку с emoji
-    icon = create_emoji_icon()
-    if icon:
-        app.setWindowIcon(icon)
+    # Иконка приложения генерируется заранее (create_icon.py) и поставляется как icon.ico
+    icon = QIcon(resource_path('icon.ico'))
+    app.setWindowIcon(icon)
     
     # Создаем и отображаем главное окно
     window = BarcodeApp()
-    if icon:
-        window.setWindowIcon(icon)
+    window.setWindowIcon(icon)
     window.showMaximized()  # Открываем в полноэкранном режиме
     
     sys.exit(app.exec_())